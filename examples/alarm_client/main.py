@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+
+import time
+import sys
+import msgpack
+import os
+import socket
+import struct
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+import argparse
+
+
+class CommandType(Enum):
+    LifeSignRequest = 0
+    LifeSignResponse = 1
+    ChannelListRequest = 200
+    ChannelListResponse = 201
+    ReadSamplesBegin = 204
+    ReadSamplesContent = 205
+    ReadSamplesEnd = 206
+    AlarmMessageRequest = 300
+    AlarmMessageResponse = 301
+
+def packetHeader(c: CommandType):
+    buffer = bytearray()
+    buffer += struct.pack('@I', 0x45554C42)  # magicToken
+    buffer += struct.pack('@B', 1)  # version
+    buffer += struct.pack('@B', 2)  # payloadType
+    buffer += struct.pack('@H', 0)  # reserved
+    process_id = os.getpid()
+    buffer += struct.pack('@Q', process_id)  # senderPid
+    unix_timestamp_millisends = int(round(time.time() * 1000))
+    buffer += struct.pack('@Q', unix_timestamp_millisends)  # senderTime_msSE
+    buffer += struct.pack('@H', 1000)  # group: om::IpcGroup::smartCoreRemotePlugin
+    buffer += struct.pack('@H', c.value)  # command
+    return buffer
+
+
+HEADER_SIZE = 28
+MAX_DATAGRAM = 65535
+
+@dataclass
+class Header:
+    magic_token: int
+    type: int
+
+
+def header_from_buffer(buf):
+    magic_token = struct.unpack('@I', buf[0:4])[0]
+    command = struct.unpack('@H', buf[26:28])[0]
+    if magic_token != 0x45554C42:
+        raise ValueError
+
+    return Header(magic_token, command)
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate      # tokens per second
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = time.monotonic()
+
+    def take(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class SampleCache:
+    """Latest value of every received channel, used for alarm snapshots."""
+
+    def __init__(self, names):
+        self.names = names    # index -> name
+        self.latest = {}      # index -> value
+
+    def update(self, payload):
+        for channel in payload['c']:
+            values = channel.get('v')
+            if values:
+                self.latest[channel['i']] = values[-1]
+
+    def snapshot(self, indices=None):
+        indices = self.latest.keys() if indices is None else indices
+        return [{"n": self.names.get(i, str(i)), "v": self.latest[i]} for i in indices if i in self.latest]
+
+
+# rate (alarms per second) and burst size per level
+DEFAULT_RATES = {
+    "info": (0.2, 2),
+    "warning": (0.5, 5),
+    "error": (1.0, 10),
+}
+# shared by all levels without an entry of their own
+OTHER_RATE = (1.0, 10)
+
+
+class AlarmClient:
+    """Sends AlarmMessageRequests without flooding smartCORE.
+
+    - Alarms with the same context and message are sent at most once per
+      `dedup_window` seconds; the number of suppressed repetitions is
+      attached to the next one as metadata "repeated".
+    - A token bucket per level limits the alarm rate; levels without a
+      rate share one bucket. Alarms without a token are dropped and counted.
+    - Up to `max_in_flight` requests wait for their AlarmMessageResponse,
+      further alarms are queued. Acknowledgements are matched by token;
+      unacknowledged requests are repeated `retries` times.
+    """
+
+    def __init__(self, sock, addr, cache=None, dedup_window=60.0, rates=None, max_in_flight=4,
+                 max_queued=32, timeout=2.0, retries=2):
+        self.sock = sock
+        self.addr = addr
+        self.cache = cache
+        self.dedup_window = dedup_window
+        self.buckets = {level: TokenBucket(*limit) for level, limit in (rates or DEFAULT_RATES).items()}
+        self.other_bucket = TokenBucket(*OTHER_RATE)
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.retries = retries
+        self.last_sent = {}      # (context, message) -> time sent
+        self.repeated = {}       # (context, message) -> suppressed since then
+        self.in_flight = {}      # token -> [payload, deadline, attempts]
+        self.queue = deque(maxlen=max_queued)
+        self.next_token = 0
+        self.next_prune = time.monotonic() + dedup_window
+
+        # statistics
+        self.sent = 0
+        self.suppressed = 0
+        self.rate_limited = 0
+        self.lost = 0
+        self.acknowledged = 0
+
+    def alarm(self, context, message, level="info", action="event", metadata=None, snapshot=None):
+        """Raises an alarm; returns its token, or None if it was suppressed or rate limited."""
+        now = time.monotonic()
+        key = (context, message)
+        last = self.last_sent.get(key)
+        if last is not None and now - last < self.dedup_window:
+            self.repeated[key] = self.repeated.get(key, 0) + 1
+            self.suppressed += 1
+            return None
+        bucket = self.buckets.get(level, self.other_bucket)
+        if not bucket.take():
+            self.rate_limited += 1
+            return None
+
+        metadata = dict(metadata or {})
+        repeated = self.repeated.pop(key, 0)
+        if repeated:
+            metadata["repeated"] = repeated
+        self.last_sent[key] = now
+
+        token = format(self.next_token, 'x')
+        self.next_token += 1
+        payload = {
+            "token": token,
+            "uuid": str(uuid.uuid4()),   # stays the same on retransmission
+            "time": int(time.time() * 1_000_000),
+            "action": action,
+            "context": context,
+            "message": message,
+            "level": level,
+        }
+        if metadata:
+            payload["metadata"] = metadata
+        if self.cache is not None:
+            payload["snapshot"] = self.cache.snapshot(snapshot)
+
+        if len(self.in_flight) < self.max_in_flight:
+            self._send(payload, 1)
+        else:
+            if len(self.queue) == self.queue.maxlen:
+                self.lost += 1
+            self.queue.append(payload)
+        return token
+
+    def _send(self, payload, attempts):
+        buffer = packetHeader(CommandType.AlarmMessageRequest)
+        buffer += msgpack.packb(payload)
+        self.sock.sendto(buffer, self.addr)
+        self.in_flight[payload["token"]] = [payload, time.monotonic() + self.timeout, attempts]
+        self.sent += 1
+
+    def _fill(self):
+        while self.queue and len(self.in_flight) < self.max_in_flight:
+            self._send(self.queue.popleft(), 1)
+
+    def handle_response(self, payload):
+        token = payload.get("token")
+        if self.in_flight.pop(token, None) is not None:
+            self.acknowledged += 1
+        self._fill()
+
+    def tick(self):
+        """Repeats or gives up requests without acknowledgement; call regularly."""
+        now = time.monotonic()
+        for token, (payload, deadline, attempts) in list(self.in_flight.items()):
+            if deadline > now:
+                continue
+            del self.in_flight[token]
+            if attempts > self.retries:
+                self.lost += 1
+            else:
+                self._send(payload, attempts + 1)
+        self._fill()
+
+        if now >= self.next_prune:
+            # forget alarms outside the dedup window, so the dictionaries don't grow forever;
+            # repetitions counted for them are only in the statistics then
+            self.next_prune = now + self.dedup_window
+            for key, sent in list(self.last_sent.items()):
+                if now - sent >= self.dedup_window:
+                    del self.last_sent[key]
+                    self.repeated.pop(key, None)
+
+    def report(self):
+        return (f'{self.sent} requests sent, {self.acknowledged} acknowledged, '
+                f'{self.suppressed} duplicates suppressed, {self.rate_limited} rate limited, '
+                f'{self.lost} lost, {len(self.in_flight)} in flight, {len(self.queue)} queued')
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Raises smartCORE alarms when a channel exceeds a threshold')
+    parser.add_argument('--port', dest='port', default=61616, type=int, required=False)
+    parser.add_argument('--addr', dest='addr', default='127.0.0.1', type=str, required=False)
+    parser.add_argument('--channel', dest='channel', default='FuncGen.Sinus', type=str, required=False)
+    parser.add_argument('--threshold', dest='threshold', default=2.5, type=float, required=False)
+    parser.add_argument('--dedup-window', dest='dedup_window', default=10.0, type=float, required=False)
+    args = parser.parse_args()
+
+    # establish connection to smartCORE
+    addr = (args.addr, args.port)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.settimeout(2.0)
+
+    buffer = packetHeader(CommandType.LifeSignRequest)
+    buffer += msgpack.packb({})
+    sock.sendto(buffer, addr)
+
+    received = sock.recv(1500)
+    header = header_from_buffer(received[:HEADER_SIZE])
+    if header.type != CommandType.LifeSignResponse.value:
+        raise RuntimeError(f"unexpected response {header.type} to LifeSignRequest")
+    if msgpack.unpackb(received[HEADER_SIZE:], raw=False)["smartcore-state"] != "Running":
+        raise RuntimeError("smartcore is not running")
+
+    # Request channel list
+    buffer = packetHeader(CommandType.ChannelListRequest)
+    buffer += msgpack.packb({})
+    sock.sendto(buffer, addr)
+    received = sock.recv(MAX_DATAGRAM)
+    header = header_from_buffer(received[:HEADER_SIZE])
+    if header.type != CommandType.ChannelListResponse.value:
+        raise RuntimeError(f"unexpected response {header.type} to ChannelListRequest")
+    channels = msgpack.unpackb(received[HEADER_SIZE:], raw=False)['c']
+    indexDict = {channel['n']: channel['i'] for channel in channels}
+    readable = [channel['i'] for channel in channels if not channel.get('w', False)]
+
+    cache = SampleCache({i: n for n, i in indexDict.items()})
+    client = AlarmClient(sock, addr, cache=cache, dedup_window=args.dedup_window)
+    watched = indexDict[args.channel]
+
+    # Read all consumer channels, so the snapshots contain their latest values
+    buffer = packetHeader(CommandType.ReadSamplesBegin)
+    payload = {
+        "t": 100,        # how many ms between packets
+        "n": 1,          # latest sample is enough
+        "e": False,
+        "c": readable
+    }
+    buffer += msgpack.packb(payload)
+    sock.sendto(buffer, addr)
+
+    sock.settimeout(0.1)
+    next_report = time.monotonic() + 5.0
+    try:
+        while True:
+            try:
+                received = sock.recv(MAX_DATAGRAM)
+            except socket.timeout:
+                received = None
+            if received is not None:
+                header = header_from_buffer(received[:HEADER_SIZE])
+                unpacked = msgpack.unpackb(received[HEADER_SIZE:], raw=False) if len(received) > HEADER_SIZE else {}
+                if header.type == CommandType.AlarmMessageResponse.value:
+                    client.handle_response(unpacked)
+                elif header.type == CommandType.ReadSamplesContent.value:
+                    cache.update(unpacked)
+                    value = cache.latest.get(watched)
+                    if value is not None and value > args.threshold:
+                        token = client.alarm(args.channel, "threshold exceeded", level="warning",
+                                             metadata={"threshold": args.threshold})
+                        if token is not None:
+                            print(f'alarm {token}: {args.channel} = {value:.3f}')
+
+            client.tick()
+            if time.monotonic() >= next_report:
+                print(client.report())
+                next_report = time.monotonic() + 5.0
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        # stop receiving samples
+        buffer = packetHeader(CommandType.ReadSamplesEnd)
+        sock.sendto(buffer, addr)
+        print(client.report())
+
+
+if __name__ == "__main__":
+    main()
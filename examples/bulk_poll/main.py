@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+
+import time
+import sys
+import msgpack
+import os
+import socket
+import struct
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+import argparse
+
+
+class CommandType(Enum):
+    LifeSignRequest = 0
+    LifeSignResponse = 1
+    ReadSamplesByNameRequest = 101
+    ReadSamplesByNameResponse = 102
+    ChannelListRequest = 200
+    ChannelListResponse = 201
+    ReadSamplesBegin = 204
+    ReadSamplesContent = 205
+    ReadSamplesEnd = 206
+
+def packetHeader(c: CommandType):
+    buffer = bytearray()
+    buffer += struct.pack('@I', 0x45554C42)  # magicToken
+    buffer += struct.pack('@B', 1)  # version
+    buffer += struct.pack('@B', 2)  # payloadType
+    buffer += struct.pack('@H', 0)  # reserved
+    process_id = os.getpid()
+    buffer += struct.pack('@Q', process_id)  # senderPid
+    unix_timestamp_millisends = int(round(time.time() * 1000))
+    buffer += struct.pack('@Q', unix_timestamp_millisends)  # senderTime_msSE
+    buffer += struct.pack('@H', 1000)  # group: om::IpcGroup::smartCoreRemotePlugin
+    buffer += struct.pack('@H', c.value)  # command
+    return buffer
+
+
+HEADER_SIZE = 28
+IP_UDP_OVERHEAD = 28  # IPv4 (20) + UDP (8)
+MAX_DATAGRAM = 65535
+
+@dataclass
+class Header:
+    magic_token: int
+    type: int
+
+
+def header_from_buffer(buf):
+    magic_token = struct.unpack('@I', buf[0:4])[0]
+    command = struct.unpack('@H', buf[26:28])[0]
+    if magic_token != 0x45554C42:
+        raise ValueError
+
+    return Header(magic_token, command)
+
+
+def pack_batches(names, mtu):
+    """Splits channel names into lists whose by-name responses fit into one datagram.
+
+    The response ({"n": name, "v": value, "t": time} per channel) is larger
+    than the request, so it is the one that has to fit into the MTU.
+    """
+    budget = mtu - IP_UDP_OVERHEAD - HEADER_SIZE
+    budget -= 1 + 2 + 3  # map header, key "c", array header (array16 worst case)
+    fixed_entry = len(msgpack.packb({"n": "", "v": 0.0, "t": 2 ** 63})) - 1  # without name
+    batches = []
+    batch = []
+    size = 0
+    for name in names:
+        entry = fixed_entry + len(msgpack.packb(name))
+        if batch and size + entry > budget:
+            batches.append(batch)
+            batch = []
+            size = 0
+        batch.append(name)
+        size += entry
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def by_name_bytes(batches):
+    """Estimated request plus response bytes of one by-name poll of these batches."""
+    total = 0
+    for batch in batches:
+        total += HEADER_SIZE + len(msgpack.packb({"c": batch}))
+        total += HEADER_SIZE + len(msgpack.packb({"c": [{"n": name, "v": 0.0, "t": 2 ** 63} for name in batch]}))
+    return total
+
+
+class BulkPoller:
+    """Polls many channels by name and merges the responses into one snapshot.
+
+    Name lists are packed into MTU-sized ReadSamplesByNameRequests and up to
+    `window` requests are kept in flight, so the snapshot latency is bounded
+    by the round trip time instead of growing with the channel count.
+    As soon as the channel indices are known (passed as `index_map` or
+    resolved on the first poll), the poller upgrades itself: the channels
+    are streamed by index via ReadSamplesBegin and snapshots no longer cost
+    any request. With auto_upgrade=False it keeps polling by name.
+    """
+
+    RESOLVE_RETRY = 10.0  # seconds until a failed resolve() is tried again
+
+    def __init__(self, sock, addr, names, mtu=1500, window=4, timeout=0.5, retries=1, index_map=None,
+                 auto_upgrade=True, interval_ms=100):
+        self.sock = sock
+        self.addr = addr
+        self.names = list(names)
+        self.window = window
+        self.timeout = timeout
+        self.retries = retries
+        self.batches = pack_batches(self.names, mtu)
+        self.batch_of = {name: b for b, batch in enumerate(self.batches) for name in batch}
+        self.index_map = None
+        self.name_of = None
+        self.unresolved = []   # names missing from the channel list, not streamed
+        if index_map is not None:
+            self._set_index_map({name: index_map[name] for name in self.names if name in index_map})
+        self.auto_upgrade = auto_upgrade
+        self.interval_ms = interval_ms
+        self._next_resolve = 0.0
+        self.streaming = False
+        self.snapshot = {}
+
+        # statistics
+        self.polls_by_name = 0
+        self.bytes_by_name = 0
+        self.requests_by_name = 0
+        self.polls_by_index = 0
+        self.bytes_by_index = 0
+        self.lost = 0
+        self.stale = 0
+        self._last_x = None
+
+    def _send(self, command, payload):
+        buffer = packetHeader(command)
+        buffer += msgpack.packb(payload)
+        self.sock.sendto(buffer, self.addr)
+        return len(buffer)
+
+    def _recv(self, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None, None
+        self.sock.settimeout(remaining)
+        try:
+            received = self.sock.recv(MAX_DATAGRAM)
+        except socket.timeout:
+            return None, None
+        return header_from_buffer(received[:HEADER_SIZE]), received
+
+    def _drain(self):
+        # responses to requests of an earlier poll must not answer this one
+        self.sock.setblocking(False)
+        try:
+            while True:
+                self.sock.recv(MAX_DATAGRAM)
+                self.stale += 1
+        except BlockingIOError:
+            pass
+
+    def _is_stale(self, channels):
+        # ReadSamplesByNameResponse has no token, but an answer to an old
+        # request carries older timestamps than the last snapshot
+        for channel in channels:
+            previous = self.snapshot.get(channel['n'])
+            t = channel.get('t')
+            if previous is not None and previous[1] is not None and t is not None and t < previous[1]:
+                return True
+        return False
+
+    def poll(self):
+        if not self.streaming and self.auto_upgrade and time.monotonic() >= self._next_resolve:
+            try:
+                self.upgrade(self.interval_ms)
+            except RuntimeError:
+                # channel list not available, keep polling by name for now
+                self._next_resolve = time.monotonic() + self.RESOLVE_RETRY
+        if self.streaming:
+            return self._poll_by_index()
+        return self._poll_by_name()
+
+    def _poll_by_name(self):
+        pending = deque(range(len(self.batches)))
+        attempts = [0] * len(self.batches)
+        in_flight = {}  # batch -> deadline
+        snapshot = {}
+        traffic = 0
+        self._drain()
+        while pending or in_flight:
+            while pending and len(in_flight) < self.window:
+                b = pending.popleft()
+                traffic += self._send(CommandType.ReadSamplesByNameRequest, {"c": self.batches[b]})
+                self.requests_by_name += 1
+                attempts[b] += 1
+                in_flight[b] = time.monotonic() + self.timeout
+
+            header, received = self._recv(min(in_flight.values()))
+            if header is None:
+                now = time.monotonic()
+                for b, deadline in list(in_flight.items()):
+                    if deadline <= now:
+                        del in_flight[b]
+                        if attempts[b] <= self.retries:
+                            pending.append(b)
+                continue
+            if header.type != CommandType.ReadSamplesByNameResponse.value:
+                continue
+
+            traffic += len(received)
+            channels = msgpack.unpackb(received[HEADER_SIZE:], raw=False).get('c', [])
+            batch = self.batch_of.get(channels[0]['n']) if channels else None
+            if batch not in in_flight or self._is_stale(channels):
+                # second answer to a retried batch, or an answer to an earlier poll
+                self.stale += 1
+                continue
+            del in_flight[batch]
+            for channel in channels:
+                snapshot[channel['n']] = (channel.get('v'), channel.get('t'))
+
+        self.polls_by_name += 1
+        self.bytes_by_name += traffic
+        self.snapshot = snapshot
+        return snapshot
+
+    def resolve(self):
+        """Requests the index of every polled channel, batched like the polls."""
+        index_map = {}
+        for batch in self.batches:
+            self._send(CommandType.ChannelListRequest, {"c": batch})
+            deadline = time.monotonic() + self.timeout * (self.retries + 1)
+            while True:
+                header, received = self._recv(deadline)
+                if header is None:
+                    raise RuntimeError("no ChannelListResponse received")
+                if header.type == CommandType.ChannelListResponse.value:
+                    break
+            for channel in msgpack.unpackb(received[HEADER_SIZE:], raw=False)['c']:
+                index_map[channel['n']] = channel['i']
+        self._set_index_map(index_map)
+        return index_map
+
+    def _set_index_map(self, index_map):
+        self.index_map = index_map
+        self.name_of = {i: n for n, i in index_map.items()}
+        self.unresolved = [name for name in self.names if name not in index_map]
+
+    def upgrade(self, interval_ms=100):
+        """Switches all resolvable channels to the cyclic byIndex transmission."""
+        if self.index_map is None:
+            self.resolve()
+        self._send(CommandType.ReadSamplesBegin, {
+            "t": interval_ms,   # ms between packets
+            "n": 1,             # latest sample is enough for a snapshot
+            "e": False,
+            "c": sorted(self.index_map.values())
+        })
+        self.streaming = True
+
+    def stop(self):
+        if self.streaming:
+            buffer = packetHeader(CommandType.ReadSamplesEnd)
+            self.sock.sendto(buffer, self.addr)
+            self.streaming = False
+
+    def _poll_by_index(self):
+        # Wait for the next packet, then drain whatever else is already queued
+        deadline = time.monotonic() + self.timeout * 4
+        traffic = 0
+        while True:
+            header, received = self._recv(deadline)
+            if header is None:
+                break
+            if header.type == CommandType.ReadSamplesContent.value:
+                traffic += len(received)
+                self._merge_content(msgpack.unpackb(received[HEADER_SIZE:], raw=False))
+                deadline = time.monotonic() + 0.001
+        self.polls_by_index += 1
+        self.bytes_by_index += traffic
+        return self.snapshot
+
+    def _merge_content(self, unpacked):
+        x = unpacked.get('x')
+        if x is not None:
+            if self._last_x is not None and x > self._last_x + 1:
+                self.lost += x - self._last_x - 1
+            self._last_x = x
+        for channel in unpacked['c']:
+            values = channel.get('v')
+            if not values:
+                continue
+            times = channel.get('t', unpacked.get('t'))
+            if isinstance(times, list):
+                t = times[-1]
+            elif times is not None:
+                t = times + unpacked.get('s', 0) * (len(values) - 1)
+            else:
+                t = None
+            self.snapshot[self.name_of[channel['i']]] = (values[-1], t)
+
+    def report(self):
+        lines = [f'{len(self.names)} channels in {len(self.batches)} request(s) per by-name poll']
+        if self.unresolved:
+            lines.append(f'not in the channel list, not streamed: {len(self.unresolved)} '
+                         f'({", ".join(self.unresolved[:5])}{", ..." if len(self.unresolved) > 5 else ""})')
+        if self.polls_by_name:
+            per_poll = self.bytes_by_name / self.polls_by_name
+            lines.append(f'by name : {self.polls_by_name} polls, {per_poll:.0f} bytes and '
+                         f'{self.requests_by_name / self.polls_by_name:.1f} round trips per snapshot, '
+                         f'{self.stale} stale responses dropped')
+        if self.polls_by_index:
+            per_poll = self.bytes_by_index / self.polls_by_index
+            lines.append(f'by index: {self.polls_by_index} polls, {per_poll:.0f} bytes per snapshot, '
+                         f'{self.lost} packets lost')
+            # compare with the measured by-name polls, or with their estimated size
+            if self.polls_by_name:
+                by_name = self.bytes_by_name / self.polls_by_name
+            else:
+                by_name = by_name_bytes(self.batches)
+            saved = by_name - per_poll
+            lines.append(f'saved   : {saved:.0f} bytes and {len(self.batches)} round trips per snapshot '
+                         f'({saved * self.polls_by_index:.0f} bytes, '
+                         f'{len(self.batches) * self.polls_by_index} round trips in total)')
+        return '\n'.join(lines)
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Polls many smartCORE channels by name in parallel batches')
+    parser.add_argument('--port', dest='port', default=61616, type=int, required=False)
+    parser.add_argument('--addr', dest='addr', default='127.0.0.1', type=str, required=False)
+    parser.add_argument('--names', dest='names', default=[], type=str, nargs='*', required=False,
+                        help='channel names to poll (default: all channels of the channel list)')
+    parser.add_argument('--mtu', dest='mtu', default=1500, type=int, required=False)
+    parser.add_argument('--window', dest='window', default=4, type=int, required=False,
+                        help='number of requests in flight')
+    parser.add_argument('--interval', dest='interval', default=0.1, type=float, required=False)
+    parser.add_argument('--by-name-only', dest='by_name_only', action='store_true',
+                        help='never switch to byIndex streaming')
+    args = parser.parse_args()
+
+    # establish connection to smartCORE
+    addr = (args.addr, args.port)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.settimeout(2.0)
+
+    buffer = packetHeader(CommandType.LifeSignRequest)
+    buffer += msgpack.packb({})
+    sock.sendto(buffer, addr)
+
+    received = sock.recv(1500)
+    header = header_from_buffer(received[:HEADER_SIZE])
+    if header.type != CommandType.LifeSignResponse.value:
+        raise RuntimeError(f"unexpected response {header.type} to LifeSignRequest")
+    if msgpack.unpackb(received[HEADER_SIZE:], raw=False)["smartcore-state"] != "Running":
+        raise RuntimeError("smartcore is not running")
+
+    names = args.names
+    index_map = None
+    if not names:
+        buffer = packetHeader(CommandType.ChannelListRequest)
+        buffer += msgpack.packb({})
+        sock.sendto(buffer, addr)
+        received = sock.recv(MAX_DATAGRAM)
+        header = header_from_buffer(received[:HEADER_SIZE])
+        if header.type != CommandType.ChannelListResponse.value:
+            raise RuntimeError(f"unexpected response {header.type} to ChannelListRequest")
+        # the channel list already maps every name, so the poller can stream right away
+        index_map = {channel['n']: channel['i'] for channel in msgpack.unpackb(received[HEADER_SIZE:], raw=False)['c']}
+        names = list(index_map)
+
+    poller = BulkPoller(sock, addr, names, mtu=args.mtu, window=args.window, index_map=index_map,
+                        auto_upgrade=not args.by_name_only, interval_ms=int(args.interval * 1000))
+    print(f'Polling {len(names)} channels in {len(poller.batches)} batches')
+
+    polls = 0
+    try:
+        while True:
+            start = time.monotonic()
+            streaming = poller.streaming
+            snapshot = poller.poll()
+            latency = (time.monotonic() - start) * 1000
+            polls += 1
+            if poller.streaming and not streaming:
+                print(f'\nSwitched {len(poller.index_map)} channels to byIndex streaming')
+                if poller.unresolved:
+                    print(f'{len(poller.unresolved)} channels are not in the channel list: {poller.unresolved}')
+                print()
+            print(f'snapshot {polls}: {len(snapshot)}/{len(names)} channels in {latency:.1f} ms')
+            if polls % 50 == 0:
+                print(poller.report())
+            sys.stdout.flush()
+
+            if not poller.streaming:
+                time.sleep(max(0.0, args.interval - (time.monotonic() - start)))
+    except KeyboardInterrupt:
+        poller.stop()
+        print(poller.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+
+import time
+import sys
+import msgpack
+import os
+import socket
+import select
+import struct
+import threading
+import multiprocessing
+import signal
+from dataclasses import dataclass
+from enum import Enum
+import argparse
+
+
+class CommandType(Enum):
+    LifeSignRequest = 0
+    LifeSignResponse = 1
+    ChannelListRequest = 200
+    ChannelListResponse = 201
+    ReadSamplesBegin = 204
+    ReadSamplesContent = 205
+    ReadSamplesEnd = 206
+
+def packetHeader(c: CommandType):
+    buffer = bytearray()
+    buffer += struct.pack('@I', 0x45554C42)  # magicToken
+    buffer += struct.pack('@B', 1)  # version
+    buffer += struct.pack('@B', 2)  # payloadType
+    buffer += struct.pack('@H', 0)  # reserved
+    process_id = os.getpid()
+    buffer += struct.pack('@Q', process_id)  # senderPid
+    unix_timestamp_millisends = int(round(time.time() * 1000))
+    buffer += struct.pack('@Q', unix_timestamp_millisends)  # senderTime_msSE
+    buffer += struct.pack('@H', 1000)  # group: om::IpcGroup::smartCoreRemotePlugin
+    buffer += struct.pack('@H', c.value)  # command
+    return buffer
+
+
+HEADER_SIZE = 28
+MAX_DATAGRAM = 65535
+
+@dataclass
+class Header:
+    magic_token: int
+    type: int
+
+
+def header_from_buffer(buf):
+    magic_token = struct.unpack('@I', buf[0:4])[0]
+    command = struct.unpack('@H', buf[26:28])[0]
+    if magic_token != 0x45554C42:
+        raise ValueError
+
+    return Header(magic_token, command)
+
+
+# not exported by the socket module; value from <asm-generic/socket.h>
+SO_RCVBUFFORCE = getattr(socket, 'SO_RCVBUFFORCE', 33)
+
+
+# per worker counters in the shared statistics array
+PACKETS, BYTES, BURSTS, MAX_BURST, LOST, SAMPLES, INODE, PORT = range(8)
+STAT_FIELDS = 8
+
+
+def set_receive_buffer(sock, size):
+    """Enlarges the socket receive buffer and returns the size the kernel granted."""
+    try:
+        if not sys.platform.startswith('linux'):
+            raise OSError
+        # not limited by net.core.rmem_max, but needs CAP_NET_ADMIN
+        sock.setsockopt(socket.SOL_SOCKET, SO_RCVBUFFORCE, size)
+    except OSError:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, size)
+    # Linux reports twice the requested size (bookkeeping overhead)
+    return sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF) // 2
+
+
+def kernel_udp_stats():
+    """Returns {socket inode: (rx_queue bytes, drops)} from /proc/net/udp."""
+    stats = {}
+    try:
+        with open('/proc/net/udp') as f:
+            next(f)
+            for line in f:
+                fields = line.split()
+                rx_queue = int(fields[4].split(':')[1], 16)
+                stats[int(fields[9])] = (rx_queue, int(fields[-1]))
+    except OSError:
+        pass
+    return stats
+
+
+class BurstReceiver:
+    """Drains a non-blocking socket in bursts into a preallocated slab.
+
+    Datagrams are received with recv_into() directly into fixed slots of
+    one bytearray until the socket is empty (or the burst is full), and
+    only then decoded. The kernel queue is emptied as fast as Python can
+    call recv, independent of the decoding cost.
+    """
+
+    def __init__(self, sock, burst=64, slot_size=MAX_DATAGRAM):
+        self.sock = sock
+        self.sock.setblocking(False)
+        self.burst = burst
+        self.slot_size = slot_size
+        self.slab = bytearray(burst * slot_size)
+        self.view = memoryview(self.slab)
+        self.lengths = [0] * burst
+        self.poller = select.poll()
+        self.poller.register(sock, select.POLLIN)
+
+    def receive(self, timeout_ms=100):
+        """Waits for data and returns the number of datagrams now in the slab."""
+        if not self.poller.poll(timeout_ms):
+            return 0
+        count = 0
+        while count < self.burst:
+            start = count * self.slot_size
+            try:
+                self.lengths[count] = self.sock.recv_into(self.view[start:start + self.slot_size])
+            except BlockingIOError:
+                break
+            count += 1
+        return count
+
+    def datagram(self, k):
+        start = k * self.slot_size
+        return self.view[start:start + self.lengths[k]]
+
+
+def receive_worker(worker, args, addr, channels, stats, stop):
+    base = worker * STAT_FIELDS
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    if args.reuseport:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(('', args.local_port if args.reuseport else 0))
+    granted = set_receive_buffer(sock, args.rcvbuf)
+    if granted < args.rcvbuf:
+        print(f'worker {worker}: receive buffer limited to {granted} bytes (see net.core.rmem_max)')
+    stats[base + INODE] = os.fstat(sock.fileno()).st_ino
+    stats[base + PORT] = sock.getsockname()[1]
+
+    if channels:
+        buffer = packetHeader(CommandType.ReadSamplesBegin)
+        buffer += msgpack.packb({
+            "t": args.interval,  # how many ms between packets
+            "n": args.samples,   # requested number of samples
+            "e": False,          # with timestamp
+            "c": channels        # this worker's share of the channels
+        })
+        sock.sendto(buffer, addr)
+
+    receiver = BurstReceiver(sock, burst=args.burst)
+    last_x = None
+    while not stop.is_set():
+        count = receiver.receive()
+        if count == 0:
+            continue
+        stats[base + BURSTS] += 1
+        if count > stats[base + MAX_BURST]:
+            stats[base + MAX_BURST] = count
+
+        for k in range(count):
+            datagram = receiver.datagram(k)
+            if len(datagram) < HEADER_SIZE or struct.unpack_from('@I', datagram, 0)[0] != 0x45554C42:
+                continue
+            stats[base + PACKETS] += 1
+            stats[base + BYTES] += len(datagram)
+            if struct.unpack_from('@H', datagram, 26)[0] != CommandType.ReadSamplesContent.value:
+                continue
+
+            unpacked = msgpack.unpackb(datagram[HEADER_SIZE:], raw=False)
+            x = unpacked['x']
+            if last_x is not None and x > last_x + 1:
+                stats[base + LOST] += x - last_x - 1
+            last_x = x
+            # ... process the samples here ...
+            stats[base + SAMPLES] += sum(len(channel.get('v', ())) for channel in unpacked['c'])
+
+    if channels:
+        buffer = packetHeader(CommandType.ReadSamplesEnd)
+        sock.sendto(buffer, addr)
+    sock.close()
+
+
+def process_worker(*args):
+    # CTRL + C reaches the whole process group: the main process sets `stop`,
+    # so the worker still ends its subscription with ReadSamplesEnd
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    receive_worker(*args)
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Receives ReadSamplesContent at high rates and reports packet loss')
+    parser.add_argument('--port', dest='port', default=61616, type=int, required=False)
+    parser.add_argument('--addr', dest='addr', default='127.0.0.1', type=str, required=False)
+    parser.add_argument('--channels', dest='channels', default=[], type=str, nargs='*', required=False,
+                        help='channel names (default: all readable channels)')
+    parser.add_argument('--interval', dest='interval', default=10, type=int, required=False)
+    parser.add_argument('--samples', dest='samples', default=10, type=int, required=False)
+    parser.add_argument('--workers', dest='workers', default=1, type=int, required=False)
+    parser.add_argument('--processes', dest='processes', action='store_true',
+                        help='run the workers as processes instead of threads')
+    parser.add_argument('--reuseport', dest='reuseport', action='store_true',
+                        help='bind all workers to --local-port with SO_REUSEPORT')
+    parser.add_argument('--local-port', dest='local_port', default=61700, type=int, required=False)
+    parser.add_argument('--rcvbuf', dest='rcvbuf', default=8 * 1024 * 1024, type=int, required=False)
+    parser.add_argument('--burst', dest='burst', default=64, type=int, required=False)
+    args = parser.parse_args()
+
+    # establish connection to smartCORE
+    addr = (args.addr, args.port)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.settimeout(2.0)
+
+    buffer = packetHeader(CommandType.LifeSignRequest)
+    buffer += msgpack.packb({})
+    sock.sendto(buffer, addr)
+
+    received = sock.recv(1500)
+    header = header_from_buffer(received[:HEADER_SIZE])
+    if header.type != CommandType.LifeSignResponse.value:
+        raise RuntimeError(f"unexpected response {header.type} to LifeSignRequest")
+    if msgpack.unpackb(received[HEADER_SIZE:], raw=False)["smartcore-state"] != "Running":
+        raise RuntimeError("smartcore is not running")
+
+    # Request channel list
+    buffer = packetHeader(CommandType.ChannelListRequest)
+    buffer += msgpack.packb({})
+    sock.sendto(buffer, addr)
+    received = sock.recv(MAX_DATAGRAM)
+    header = header_from_buffer(received[:HEADER_SIZE])
+    if header.type != CommandType.ChannelListResponse.value:
+        raise RuntimeError(f"unexpected response {header.type} to ChannelListRequest")
+    channel_list = msgpack.unpackb(received[HEADER_SIZE:], raw=False)['c']
+    sock.close()
+
+    if args.channels:
+        indexDict = {channel['n']: channel['i'] for channel in channel_list}
+        selected_chn = [indexDict[name] for name in args.channels]
+    else:
+        selected_chn = [channel['i'] for channel in channel_list if not channel.get('w', False)]
+
+    # With SO_REUSEPORT the kernel picks the socket by hashing the sender
+    # address, so a single subscription always lands on the same worker.
+    # Without it, every worker subscribes to its own share of the channels.
+    if args.reuseport:
+        shares = [selected_chn] + [[] for _ in range(args.workers - 1)]
+    else:
+        shares = [selected_chn[w::args.workers] for w in range(args.workers)]
+
+    if args.processes:
+        stats = multiprocessing.Array('Q', args.workers * STAT_FIELDS, lock=False)
+        stop = multiprocessing.Event()
+        workers = [multiprocessing.Process(target=process_worker, args=(w, args, addr, shares[w], stats, stop))
+                   for w in range(args.workers)]
+    else:
+        stats = [0] * (args.workers * STAT_FIELDS)
+        stop = threading.Event()
+        workers = [threading.Thread(target=receive_worker, args=(w, args, addr, shares[w], stats, stop))
+                   for w in range(args.workers)]
+    for worker in workers:
+        worker.start()
+
+    previous = [0] * (args.workers * STAT_FIELDS)
+    drops_at_start = {}
+    try:
+        while True:
+            time.sleep(1.0)
+            kernel = kernel_udp_stats()
+            current = list(stats)
+            for w in range(args.workers):
+                base = w * STAT_FIELDS
+                inode = current[base + INODE]
+                rx_queue, drops = kernel.get(inode, (0, 0))
+                drops -= drops_at_start.setdefault(inode, drops)
+                print(f'worker {w} port {current[base + PORT]:5d}: '
+                      f'{current[base + PACKETS] - previous[base + PACKETS]:6d} pkt/s '
+                      f'{(current[base + BYTES] - previous[base + BYTES]) / 1e6:6.2f} MB/s '
+                      f'{current[base + SAMPLES] - previous[base + SAMPLES]:8d} samples/s '
+                      f'max burst {current[base + MAX_BURST]:3d} | '
+                      f'lost (x gaps) {current[base + LOST]:5d} kernel drops {drops:5d} queued {rx_queue:7d} B')
+            previous = current
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+
+import time
+import sys
+import msgpack
+import os
+import socket
+import struct
+from io import BytesIO
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+import argparse
+
+
+class CommandType(Enum):
+    LifeSignRequest = 0
+    LifeSignResponse = 1
+    ChannelListRequest = 200
+    ChannelListResponse = 201
+    ReadSamplesBegin = 204
+    ReadSamplesContent = 205
+    ReadSamplesEnd = 206
+
+def packetHeader(c: CommandType):
+    buffer = bytearray()
+    buffer += struct.pack('@I', 0x45554C42)  # magicToken
+    buffer += struct.pack('@B', 1)  # version
+    buffer += struct.pack('@B', 2)  # payloadType
+    buffer += struct.pack('@H', 0)  # reserved
+    process_id = os.getpid()
+    buffer += struct.pack('@Q', process_id)  # senderPid
+    unix_timestamp_millisends = int(round(time.time() * 1000))
+    buffer += struct.pack('@Q', unix_timestamp_millisends)  # senderTime_msSE
+    buffer += struct.pack('@H', 1000)  # group: om::IpcGroup::smartCoreRemotePlugin
+    buffer += struct.pack('@H', c.value)  # command
+    return buffer
+
+
+HEADER_SIZE = 28
+
+@dataclass
+class Header:
+    magic_token: int
+    type: int
+    sender_pid: int
+    sender_time_ms: int
+
+
+def header_from_buffer(buf):
+    magic_token = struct.unpack('@I', buf[0:4])[0]
+    sender_pid = struct.unpack('@Q', buf[8:16])[0]
+    sender_time_ms = struct.unpack('@Q', buf[16:24])[0]
+    command = struct.unpack('@H', buf[26:28])[0]
+    if magic_token != 0x45554C42:
+        raise ValueError
+
+    return Header(magic_token, command, sender_pid, sender_time_ms)
+
+
+def now_ms():
+    return time.time() * 1000
+
+
+class ClockEstimator:
+    """Estimates the smartCORE clock relative to the local clock.
+
+    Every LifeSignRequest/LifeSignResponse round trip yields one NTP-style
+    sample: t1 (local send), t2 (senderTime_msSE of the response) and
+    t4 (local receive). smartCORE only stamps the response once, so t2 is
+    used for both server receive and server send time.
+
+        offset = t2 - (t1 + t4) / 2     (smartCORE minus local clock)
+        delay  = t4 - t1                (round trip)
+
+    The round trips with the smallest delay carry the least queueing
+    noise, so the current offset is taken from the best sample of the
+    window and the drift from a least squares fit over the better half.
+    """
+
+    def __init__(self, window=32):
+        self.samples = deque(maxlen=window)  # (t4, offset, delay)
+        self.offset_ms = 0.0
+        self.drift_ppm = 0.0
+        self.ref_ms = None
+        self.min_delay_ms = None
+
+    def add_round_trip(self, t1_ms, server_ms, t4_ms):
+        delay = t4_ms - t1_ms
+        if delay < 0:
+            return
+        offset = server_ms - (t1_ms + t4_ms) / 2
+        self.samples.append((t4_ms, offset, delay))
+        self._update()
+
+    def _update(self):
+        best = min(self.samples, key=lambda s: s[2])
+        self.ref_ms, self.offset_ms, self.min_delay_ms = best
+
+        # Fit drift only over the round trips with low delay
+        filtered = sorted(self.samples, key=lambda s: s[2])[:max(2, len(self.samples) // 2)]
+        if len(filtered) < 2:
+            return
+        mean_t = sum(s[0] for s in filtered) / len(filtered)
+        mean_o = sum(s[1] for s in filtered) / len(filtered)
+        var_t = sum((s[0] - mean_t) ** 2 for s in filtered)
+        if var_t < 1000.0 ** 2:
+            # less than ~1 s of spread, slope would be noise
+            return
+        cov = sum((s[0] - mean_t) * (s[1] - mean_o) for s in filtered)
+        self.drift_ppm = cov / var_t * 1e6
+
+    @property
+    def synchronized(self):
+        return self.ref_ms is not None
+
+    def offset_at(self, local_ms):
+        return self.offset_ms + self.drift_ppm * 1e-6 * (local_ms - self.ref_ms)
+
+    def to_local(self, server_ms, local_ms):
+        """Converts a smartCORE time to the local time base."""
+        return server_ms - self.offset_at(local_ms)
+
+    def answers(self, t1_ms, server_ms):
+        """False for a late response to an earlier request, which would fake a short round trip."""
+        if not self.synchronized:
+            return True
+        # the response can not be stamped before the request was sent
+        return server_ms >= t1_ms + self.offset_at(t1_ms) - self.min_delay_ms - 1.0
+
+    def one_way_delay(self, header, recv_ms):
+        """Transit time of a smartCORE packet, accurate to ~1 ms (header resolution)."""
+        return recv_ms - self.to_local(header.sender_time_ms, recv_ms)
+
+    def sample_age(self, sample_ms, processed_ms):
+        """Time from the sample timestamp until the sample gets processed locally."""
+        return processed_ms - self.to_local(sample_ms, processed_ms)
+
+
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.count += 1
+        self.mean += (value - self.mean) / self.count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def __str__(self):
+        if self.count == 0:
+            return 'n/a'
+        return f'mean {self.mean:7.2f} min {self.min:7.2f} max {self.max:7.2f} ms'
+
+
+def sample_times(payload, channel):
+    # Equidistant transmission: packet-level start time "t" and spacing "s"
+    if 't' in channel:
+        t = channel['t']
+        return t if isinstance(t, list) else [t]
+    if 't' in payload:
+        step = payload.get('s', 0)
+        return [payload['t'] + k * step for k in range(len(channel.get('v', [])))]
+    return []
+
+
+def drain(sock):
+    """Discards datagrams that are already queued, e.g. responses that arrived after a timeout."""
+    timeout = sock.gettimeout()
+    sock.setblocking(False)
+    try:
+        while True:
+            sock.recv(65535)
+    except BlockingIOError:
+        pass
+    finally:
+        sock.settimeout(timeout)
+
+
+def sync_clock(sock, addr, estimator, rounds):
+    for _ in range(rounds):
+        drain(sock)
+        buffer = packetHeader(CommandType.LifeSignRequest)
+        buffer += msgpack.packb({})
+        t1 = now_ms()
+        sock.sendto(buffer, addr)
+        try:
+            received = sock.recv(1500)
+        except socket.timeout:
+            continue
+        t4 = now_ms()
+        header = header_from_buffer(received[:HEADER_SIZE])
+        if header.type == CommandType.LifeSignResponse.value and estimator.answers(t1, header.sender_time_ms):
+            estimator.add_round_trip(t1, header.sender_time_ms, t4)
+        time.sleep(0.05)
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Estimates clock offset, latency and sample age of smartCORE data')
+    parser.add_argument('--port', dest='port', default=61616, type=int, required=False)
+    parser.add_argument('--addr', dest='addr', default='127.0.0.1', type=str, required=False)
+    parser.add_argument('--channels', dest='channels', default=[0], type=int, nargs='+', required=False)
+    parser.add_argument('--sync-rounds', dest='sync_rounds', default=8, type=int, required=False)
+    parser.add_argument('--resync', dest='resync', default=10.0, type=float, required=False,
+                        help='seconds between LifeSign round trips while reading')
+    parser.add_argument('--sync-timeout', dest='sync_timeout', default=2.0, type=float, required=False,
+                        help='seconds after which an unanswered LifeSignRequest is given up')
+    parser.add_argument('--sample-time-unit', dest='unit', default='us', choices=['us', 'ms'], required=False,
+                        help='unit of the sample timestamps "t"')
+    args = parser.parse_args()
+    to_ms = 1e-3 if args.unit == 'us' else 1.0
+
+    # establish connection to smartCORE
+    addr = (args.addr, args.port)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.settimeout(2.0)
+
+    buffer = packetHeader(CommandType.LifeSignRequest)
+    buffer += msgpack.packb({})
+    sock.sendto(buffer, addr)
+
+    received = sock.recv(1500)
+    header = header_from_buffer(received[:HEADER_SIZE])
+    if header.type != CommandType.LifeSignResponse.value:
+        raise RuntimeError(f"unexpected response {header.type} to LifeSignRequest")
+
+    buf = BytesIO()
+    buf.write(received[HEADER_SIZE:])
+    buf.seek(0)
+    unpacker = msgpack.Unpacker(buf, raw=False)
+    for unpacked in unpacker:
+        if unpacked["smartcore-state"] != "Running":
+            raise RuntimeError("smartcore is not running")
+
+    estimator = ClockEstimator()
+    sync_clock(sock, addr, estimator, args.sync_rounds)
+    if not estimator.synchronized:
+        raise RuntimeError("no LifeSignResponse received for clock synchronisation")
+    print(f'offset {estimator.offset_ms:.1f} ms, best round trip {estimator.min_delay_ms:.1f} ms')
+
+    print('\n\nRead Samples Begin')
+    buffer = packetHeader(CommandType.ReadSamplesBegin)
+    payload = {
+        "t": 100,           # how many ms between packets
+        "n": 10,            # requested number of samples
+        "e": False,         # with timestamp
+        "c": args.channels  # Selected channels
+    }
+    buffer += msgpack.packb(payload)
+    sock.sendto(buffer, addr)
+
+    delay_stats = RunningStats()
+    age_stats = RunningStats()
+    last_index = None
+    lost = 0
+    pending_sync = None     # send time of the unanswered LifeSignRequest
+    sync_deadline = 0.0
+    next_sync = time.monotonic() + args.resync
+    next_report = time.monotonic() + 1.0
+    try:
+        while True:
+            # Keep tracking offset and drift while data is streaming
+            if pending_sync is not None and time.monotonic() >= sync_deadline:
+                # request or response lost, try again with the next resync
+                pending_sync = None
+            if pending_sync is None and time.monotonic() >= next_sync:
+                buffer = packetHeader(CommandType.LifeSignRequest)
+                buffer += msgpack.packb({})
+                pending_sync = now_ms()
+                sock.sendto(buffer, addr)
+                sync_deadline = time.monotonic() + args.sync_timeout
+                next_sync = time.monotonic() + args.resync
+
+            try:
+                received = sock.recv(1500)
+            except socket.timeout:
+                continue
+            recv_ms = now_ms()
+            header = header_from_buffer(received[:HEADER_SIZE])
+
+            if header.type == CommandType.LifeSignResponse.value:
+                if pending_sync is not None and estimator.answers(pending_sync, header.sender_time_ms):
+                    estimator.add_round_trip(pending_sync, header.sender_time_ms, recv_ms)
+                    pending_sync = None
+                continue
+            if header.type != CommandType.ReadSamplesContent.value:
+                print(f'Received wrong header type: {header.type}')
+                continue
+
+            delay_stats.add(estimator.one_way_delay(header, recv_ms))
+
+            unpacked = msgpack.unpackb(received[HEADER_SIZE:], raw=False)
+            if last_index is not None and unpacked['x'] > last_index + 1:
+                lost += unpacked['x'] - last_index - 1
+            last_index = unpacked['x']
+
+            # ... control logic would act on the samples here ...
+            processed_ms = now_ms()
+            for channel in unpacked['c']:
+                for t in sample_times(unpacked, channel):
+                    age_stats.add(estimator.sample_age(t * to_ms, processed_ms))
+
+            if time.monotonic() >= next_report:
+                print(f'offset {estimator.offset_at(recv_ms):8.2f} ms  drift {estimator.drift_ppm:7.2f} ppm  '
+                      f'lost {lost}')
+                print(f'  one-way delay {delay_stats}')
+                print(f'  sample age    {age_stats}')
+                sys.stdout.flush()
+                delay_stats = RunningStats()
+                age_stats = RunningStats()
+                next_report = time.monotonic() + 1.0
+
+    except KeyboardInterrupt:
+        # stop receiving samples
+        buffer = packetHeader(CommandType.ReadSamplesEnd)
+        sock.sendto(buffer, addr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Measures startup time and memory of the embedded client without a smartCORE.
+
+    ./bench.py [--channels 20] [--capacity 1000] [--packets 2000]
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+STARTUP = {
+    'python (no imports)': 'pass',
+    'embedded client': 'import main',
+    'read data example': "import sys; sys.path.insert(0, '../remote_read_data'); import remote_read_signal_data",
+}
+
+WORKLOAD = '''
+import sys, time
+def rss():
+    status = dict(line.split(':', 1) for line in open('/proc/self/status'))
+    return int(status['VmRSS'].split()[0]), int(status['VmHWM'].split()[0])
+before = rss()
+import msgpack, main
+imported = rss()
+channels, capacity, packets = {channels}, {capacity}, {packets}
+store = main.SampleStore({{i: 'channel.%d' % i for i in range(channels)}}, capacity)
+now = int(time.time() * 1e6)
+for x in range(packets):
+    payload = {{"x": x, "c": [{{"i": i, "v": [float(x + k) for k in range(10)],
+                              "t": [now + (x * 10 + k) * 1000 for k in range(10)]}} for i in range(channels)]}}
+    buf = bytes(main.HEADER_SIZE) + msgpack.packb(payload)
+    store.add_packet(main.unpack(buf))
+filled = rss()
+print(before[0], imported[0], filled[0], filled[1])
+'''
+
+
+def median_startup(code, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=HERE, check=True)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup time and memory benchmark of the embedded client')
+    parser.add_argument('--runs', dest='runs', default=20, type=int, required=False)
+    parser.add_argument('--channels', dest='channels', default=20, type=int, required=False)
+    parser.add_argument('--capacity', dest='capacity', default=1000, type=int, required=False)
+    parser.add_argument('--packets', dest='packets', default=2000, type=int, required=False)
+    args = parser.parse_args()
+
+    print(f'startup (median of {args.runs} runs)')
+    for name, code in STARTUP.items():
+        try:
+            print(f'  {name:22s} {median_startup(code, args.runs):7.1f} ms')
+        except subprocess.CalledProcessError:
+            print(f'  {name:22s}  failed')
+
+    code = WORKLOAD.format(channels=args.channels, capacity=args.capacity, packets=args.packets)
+    output = subprocess.run([sys.executable, '-c', code], cwd=HERE, check=True,
+                            capture_output=True, text=True).stdout
+    before, imported, filled, peak = (int(v) for v in output.split())
+    buffers = args.channels * args.capacity * 16 / 1024
+    print(f'\nmemory ({args.channels} channels x {args.capacity} samples, {args.packets} packets)')
+    print(f'  interpreter             {before / 1024:7.1f} MiB')
+    print(f'  after import            {imported / 1024:7.1f} MiB (+{(imported - before) / 1024:.1f})')
+    print(f'  after filling buffers   {filled / 1024:7.1f} MiB (+{(filled - imported) / 1024:.1f}, '
+          f'buffers {buffers / 1024:.1f})')
+    print(f'  peak                    {peak / 1024:7.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+import socket
+import struct
+from array import array
+
+import msgpack
+
+# argparse is only imported in main(), so importing this module stays cheap
+
+LifeSignRequest = 0
+LifeSignResponse = 1
+ChannelListRequest = 200
+ChannelListResponse = 201
+WriteSamplesRequest = 202
+ReadSamplesBegin = 204
+ReadSamplesContent = 205
+ReadSamplesEnd = 206
+
+MAGIC_TOKEN = 0x45554C42
+HEADER_SIZE = 28
+HEADER = struct.Struct('@IBBHQQHH')
+PID = os.getpid()
+
+# data types that fit into the 'd' buffers
+NUMERIC_TYPES = frozenset(('float', 'double', 'bool', 'int8', 'int16', 'int32', 'int64',
+                           'uint8', 'uint16', 'uint32', 'uint64'))
+
+
+def packetHeader(command):
+    # version 1, payloadType 2, group 1000 (om::IpcGroup::smartCoreRemotePlugin)
+    return HEADER.pack(MAGIC_TOKEN, 1, 2, 0, PID, int(time.time() * 1000), 1000, command)
+
+
+class Header:
+    __slots__ = ('magic_token', 'type', 'sender_time_ms')
+
+    def __init__(self, magic_token, type, sender_time_ms):
+        self.magic_token = magic_token
+        self.type = type
+        self.sender_time_ms = sender_time_ms
+
+
+def header_from_buffer(buf):
+    magic_token, _, _, _, _, sender_time_ms, _, command = HEADER.unpack_from(buf)
+    if magic_token != MAGIC_TOKEN:
+        raise ValueError
+
+    return Header(magic_token, command, sender_time_ms)
+
+
+def command_of(buf):
+    """Command of a packet without creating a Header object (0xFFFF if invalid)."""
+    if len(buf) < HEADER_SIZE or struct.unpack_from('@I', buf, 0)[0] != MAGIC_TOKEN:
+        return 0xFFFF
+    return struct.unpack_from('@H', buf, 26)[0]
+
+
+class ChannelBuffer:
+    """Ring buffer of the last `capacity` samples of one channel.
+
+    Values and timestamps live in two preallocated arrays (8 bytes per
+    value and timestamp), so storing a sample creates no Python object.
+    """
+
+    __slots__ = ('values', 'times', 'capacity', 'head', 'count')
+
+    def __init__(self, capacity):
+        self.values = array('d', bytes(8 * capacity))
+        self.times = array('q', bytes(8 * capacity))
+        self.capacity = capacity
+        self.head = 0   # next write position
+        self.count = 0
+
+    def extend(self, values, times):
+        n = len(values)
+        if n >= self.capacity:
+            values = values[n - self.capacity:]
+            times = times[n - self.capacity:]
+            n = self.capacity
+        first = min(n, self.capacity - self.head)
+        self.values[self.head:self.head + first] = array('d', values[:first])
+        self.times[self.head:self.head + first] = array('q', times[:first])
+        if first < n:
+            self.values[0:n - first] = array('d', values[first:])
+            self.times[0:n - first] = array('q', times[first:])
+        self.head = (self.head + n) % self.capacity
+        self.count = min(self.capacity, self.count + n)
+
+    def latest(self):
+        if not self.count:
+            return None, None
+        k = self.head - 1
+        return self.values[k], self.times[k]
+
+    def window(self):
+        """Returns (values, times) of the buffered samples, oldest first."""
+        if self.count < self.capacity:
+            return self.values[:self.count], self.times[:self.count]
+        return (self.values[self.head:] + self.values[:self.head],
+                self.times[self.head:] + self.times[:self.head])
+
+
+class SampleStore:
+    __slots__ = ('buffers', 'names', 'last_x', 'lost', 'packets', 'skipped')
+
+    def __init__(self, channels, capacity):
+        # channels: {index: name}
+        self.buffers = {index: ChannelBuffer(capacity) for index in channels}
+        self.names = channels
+        self.last_x = -1
+        self.lost = 0
+        self.packets = 0
+        self.skipped = []    # names of non numeric channels
+
+    def add_packet(self, payload):
+        x = payload['x']
+        if self.last_x >= 0 and x > self.last_x + 1:
+            self.lost += x - self.last_x - 1
+        self.last_x = x
+        self.packets += 1
+
+        for channel in payload['c']:
+            buffer = self.buffers.get(channel['i'])
+            values = channel.get('v')
+            if buffer is None or not values:
+                continue
+            times = channel.get('t')
+            if times is None:
+                # equidistant transmission
+                start = payload['t']
+                step = payload.get('s', 0)
+                times = range(start, start + step * len(values), step) if step else [start] * len(values)
+            try:
+                buffer.extend(values, times)
+            except TypeError:
+                # e.g. a string channel: stop buffering it instead of failing
+                del self.buffers[channel['i']]
+                self.skipped.append(self.names.pop(channel['i']))
+
+
+def unpack(buf):
+    # tuples instead of lists: smaller and faster to create
+    return msgpack.unpackb(buf[HEADER_SIZE:], raw=False, use_list=False)
+
+
+def receive(sock, command, size=65535):
+    while True:
+        received = sock.recv(size)
+        if command_of(received) == command:
+            return received
+
+
+def main():
+    import argparse
+
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Low footprint client keeping recent samples in compact buffers')
+    parser.add_argument('--port', dest='port', default=61616, type=int, required=False)
+    parser.add_argument('--addr', dest='addr', default='127.0.0.1', type=str, required=False)
+    parser.add_argument('--channels', dest='channels', default=[], type=str, nargs='*', required=False,
+                        help='channel names (default: all readable numeric channels)')
+    parser.add_argument('--capacity', dest='capacity', default=1000, type=int, required=False,
+                        help='samples kept per channel')
+    args = parser.parse_args()
+
+    # establish connection to smartCORE
+    addr = (args.addr, args.port)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.settimeout(2.0)
+
+    sock.sendto(packetHeader(LifeSignRequest) + msgpack.packb({}), addr)
+    if unpack(receive(sock, LifeSignResponse))["smartcore-state"] != "Running":
+        raise RuntimeError("smartcore is not running")
+
+    # with data types ("d"), so non numeric channels can be left out
+    sock.sendto(packetHeader(ChannelListRequest) + msgpack.packb({"f": ["d"]}), addr)
+    channel_list = unpack(receive(sock, ChannelListResponse))['c']
+    if args.channels:
+        wanted = set(args.channels)
+        selected = {channel['i']: channel['n'] for channel in channel_list if channel['n'] in wanted}
+    else:
+        selected = {channel['i']: channel['n'] for channel in channel_list
+                    if not channel.get('w', False) and channel.get('d', 'double') in NUMERIC_TYPES}
+    del channel_list
+
+    store = SampleStore(selected, args.capacity)
+    sock.sendto(packetHeader(ReadSamplesBegin) + msgpack.packb({
+        "t": 100,                   # how many ms between packets
+        "n": 10,                    # requested number of samples
+        "e": False,                 # with timestamp
+        "c": sorted(selected)       # Selected channels
+    }), addr)
+
+    # one receive buffer for the whole run
+    received = bytearray(65535)
+    view = memoryview(received)
+    next_report = time.monotonic() + 1.0
+    try:
+        while True:
+            try:
+                n = sock.recv_into(received)
+            except socket.timeout:
+                continue
+            if command_of(view[:n]) == ReadSamplesContent:
+                store.add_packet(unpack(view[:n]))
+
+            if time.monotonic() >= next_report:
+                next_report += 1.0
+                for index, name in store.names.items():
+                    value, t = store.buffers[index].latest()
+                    print(f'{name}: {value} ({t})')
+                print(f'{store.packets} packets, {store.lost} lost')
+                if store.skipped:
+                    print(f'not numeric, skipped: {store.skipped}')
+                sys.stdout.flush()
+    except KeyboardInterrupt:
+        # stop receiving samples
+        sock.sendto(packetHeader(ReadSamplesEnd), addr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+
+import time
+import sys
+import msgpack
+import os
+import socket
+import struct
+import heapq
+import queue
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from dataclasses import dataclass
+from enum import Enum
+import argparse
+
+import numpy as np
+
+
+class CommandType(Enum):
+    LifeSignRequest = 0
+    LifeSignResponse = 1
+    ChannelListRequest = 200
+    ChannelListResponse = 201
+    WriteSamplesRequest = 202
+    WriteSamplesResponse = 203
+    ReadSamplesBegin = 204
+    ReadSamplesContent = 205
+    ReadSamplesEnd = 206
+
+def packetHeader(c: CommandType):
+    buffer = bytearray()
+    buffer += struct.pack('@I', 0x45554C42)  # magicToken
+    buffer += struct.pack('@B', 1)  # version
+    buffer += struct.pack('@B', 2)  # payloadType
+    buffer += struct.pack('@H', 0)  # reserved
+    process_id = os.getpid()
+    buffer += struct.pack('@Q', process_id)  # senderPid
+    unix_timestamp_millisends = int(round(time.time() * 1000))
+    buffer += struct.pack('@Q', unix_timestamp_millisends)  # senderTime_msSE
+    buffer += struct.pack('@H', 1000)  # group: om::IpcGroup::smartCoreRemotePlugin
+    buffer += struct.pack('@H', c.value)  # command
+    return buffer
+
+
+HEADER_SIZE = 28
+MAX_DATAGRAM = 65535
+# Every value and timestamp takes at least one byte in the datagram
+SLOT_VALUES = MAX_DATAGRAM
+
+@dataclass
+class Header:
+    magic_token: int
+    type: int
+
+
+def header_from_buffer(buf):
+    magic_token = struct.unpack('@I', buf[0:4])[0]
+    command = struct.unpack('@H', buf[26:28])[0]
+    if magic_token != 0x45554C42:
+        raise ValueError
+
+    return Header(magic_token, command)
+
+
+# --- worker side -----------------------------------------------------------
+
+_segments = {}
+
+
+def _init_worker():
+    # CTRL + C is handled by the receiver, which drains the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _slot_array(segment_name, slot):
+    segment = _segments.get(segment_name)
+    if segment is None:
+        segment = shared_memory.SharedMemory(name=segment_name)
+        _segments[segment_name] = segment
+    return np.ndarray((SLOT_VALUES,), dtype=np.float64, buffer=segment.buf, offset=slot * SLOT_VALUES * 8)
+
+
+def analyse_packet(segment_name, slot, layout, time_scale):
+    """Runs in a worker process; reads the packet from its shared memory slot.
+
+    layout: [(channel index, value offset, count, time offset or -1, time step), ...]
+    Returns {channel index: (rms, dominant frequency in Hz, last timestamp)}.
+    """
+    data = _slot_array(segment_name, slot)
+    results = {}
+    for index, offset, count, time_offset, step in layout:
+        values = data[offset:offset + count]
+        if time_offset >= 0:
+            times = data[time_offset:time_offset + count]
+            last = times[-1]
+            dt = np.median(np.diff(times)) * time_scale if count > 1 else 0.0
+        else:
+            last = None
+            dt = step * time_scale
+
+        rms = float(np.sqrt(np.mean(values * values)))
+        peak = 0.0
+        if count >= 4 and dt > 0:
+            spectrum = np.abs(np.fft.rfft((values - values.mean()) * np.hanning(count)))
+            peak = float(np.fft.rfftfreq(count, dt)[np.argmax(spectrum[1:]) + 1])
+        results[index] = (rms, peak, last)
+    return results
+
+
+# --- receiver side ---------------------------------------------------------
+
+class AnalyticsStage:
+    """Hands decoded ReadSamplesContent packets to a process pool.
+
+    The values of every packet are copied into a free slot of one shared
+    memory segment, so only the small channel layout has to be pickled.
+    Results are released in the order of the packet index "x", no matter
+    which worker finishes first.
+    """
+
+    def __init__(self, workers, slots=None, time_scale=1e-6):
+        self.slots = slots or 2 * workers
+        self.time_scale = time_scale
+        self.segment = shared_memory.SharedMemory(create=True, size=self.slots * SLOT_VALUES * 8)
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        self.free = list(range(self.slots))
+        self.completed = queue.SimpleQueue()
+        # x repeats after a smartCORE restart or a duplicated datagram, so
+        # packets are identified by (x, submission number)
+        self.pending = []   # heap of submitted (x, seq)
+        self.results = {}   # (x, seq) -> result, waiting for its predecessors
+        self.seq = 0
+        self.running = 0    # submitted futures not collected yet
+        self.stalls = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def _slot_array(self, slot):
+        return np.ndarray((SLOT_VALUES,), dtype=np.float64, buffer=self.segment.buf,
+                          offset=slot * SLOT_VALUES * 8)
+
+    def submit(self, payload):
+        """Copies the packet into shared memory and queues it; blocks only if all slots are busy."""
+        if not self.free:
+            self.stalls += 1
+            self._wait_one()
+        slot = self.free.pop()
+        data = self._slot_array(slot)
+
+        layout = []
+        offset = 0
+        for channel in payload['c']:
+            values = channel.get('v')
+            if not values:
+                continue
+            count = len(values)
+            try:
+                data[offset:offset + count] = values
+            except (TypeError, ValueError):
+                # non numeric channel (e.g. strings)
+                self.skipped += 1
+                continue
+            time_offset = -1
+            times = channel.get('t')
+            if isinstance(times, list) and len(times) == count:
+                time_offset = offset + count
+                data[time_offset:time_offset + count] = times
+            layout.append((channel['i'], offset, count, time_offset, payload.get('s', 0)))
+            offset += 2 * count
+
+        key = (payload['x'], self.seq)
+        self.seq += 1
+        heapq.heappush(self.pending, key)
+        future = self.pool.submit(analyse_packet, self.segment.name, slot, layout, self.time_scale)
+        self.running += 1
+        future.add_done_callback(lambda f, key=key, slot=slot: self.completed.put((key, slot, f)))
+
+    def _collect(self, key, slot, future):
+        self.free.append(slot)
+        self.running -= 1
+        try:
+            self.results[key] = future.result()
+        except Exception as e:
+            # skip this packet; the receiver and the packets after it go on
+            self.failed += 1
+            self.results[key] = None
+            print(f'analysis of packet {key[0]} failed: {e!r}')
+
+    def _wait_one(self):
+        self._collect(*self.completed.get())
+
+    def ready(self):
+        """Returns [(x, result), ...] of all packets whose predecessors are done as well.
+
+        Packets whose analysis failed are left out.
+        """
+        while True:
+            try:
+                self._collect(*self.completed.get_nowait())
+            except queue.Empty:
+                break
+        out = []
+        while self.pending and self.pending[0] in self.results:
+            key = heapq.heappop(self.pending)
+            result = self.results.pop(key)
+            if result is not None:
+                out.append((key[0], result))
+        return out
+
+    def drain(self):
+        """Waits until every submitted packet is done and returns the remaining results."""
+        while self.running:
+            self._wait_one()
+        return self.ready()
+
+    def close(self):
+        self.pool.shutdown()
+        self.segment.close()
+        self.segment.unlink()
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Analyses smartCORE signals in a process pool')
+    parser.add_argument('--port', dest='port', default=61616, type=int, required=False)
+    parser.add_argument('--addr', dest='addr', default='127.0.0.1', type=str, required=False)
+    parser.add_argument('--channels', dest='channels', type=str, nargs='+', required=False,
+                        default=['FuncGen.Sawtooth', 'FuncGen.Sinus', 'FuncGen.RectangleOffOn'])
+    parser.add_argument('--output', dest='output', default='remote.analytics.peak', type=str, required=False,
+                        help='producer channel for the dominant frequency of the first channel')
+    parser.add_argument('--workers', dest='workers', default=os.cpu_count(), type=int, required=False)
+    parser.add_argument('--interval', dest='interval', default=100, type=int, required=False)
+    parser.add_argument('--samples', dest='samples', default=100, type=int, required=False)
+    parser.add_argument('--sample-time-unit', dest='unit', default='us', choices=['us', 'ms'], required=False,
+                        help='unit of the sample timestamps "t"')
+    args = parser.parse_args()
+
+    # establish connection to smartCORE
+    addr = (args.addr, args.port)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.settimeout(2.0)
+
+    buffer = packetHeader(CommandType.LifeSignRequest)
+    buffer += msgpack.packb({})
+    sock.sendto(buffer, addr)
+
+    received = sock.recv(1500)
+    header = header_from_buffer(received[:HEADER_SIZE])
+    if header.type != CommandType.LifeSignResponse.value:
+        raise RuntimeError(f"unexpected response {header.type} to LifeSignRequest")
+    if msgpack.unpackb(received[HEADER_SIZE:], raw=False)["smartcore-state"] != "Running":
+        raise RuntimeError("smartcore is not running")
+
+    # Request channel list
+    buffer = packetHeader(CommandType.ChannelListRequest)
+    buffer += msgpack.packb({})
+    sock.sendto(buffer, addr)
+    received = sock.recv(MAX_DATAGRAM)
+    header = header_from_buffer(received[:HEADER_SIZE])
+    while header.type != CommandType.ChannelListResponse.value:
+        received = sock.recv(MAX_DATAGRAM)
+        header = header_from_buffer(received[:HEADER_SIZE])
+    channels = msgpack.unpackb(received[HEADER_SIZE:], raw=False)['c']
+    indexDict = {channel['n']: channel['i'] for channel in channels}
+    writable = {channel['n'] for channel in channels if channel.get('w', False)}
+    selected_chn = [indexDict[name] for name in args.channels]
+    output = indexDict[args.output] if args.output in writable else None
+
+    stage = AnalyticsStage(args.workers, time_scale=1e-6 if args.unit == 'us' else 1e-3)
+
+    print('\n\nRead Samples Begin')
+    buffer = packetHeader(CommandType.ReadSamplesBegin)
+    payload = {
+        "t": args.interval,  # how many ms between packets
+        "n": args.samples,   # requested number of samples
+        "e": False,          # with timestamp
+        "c": selected_chn    # Selected channels
+    }
+    buffer += msgpack.packb(payload)
+    sock.sendto(buffer, addr)
+
+    # short timeout, so finished results get emitted even if no packet arrives
+    sock.settimeout(0.01)
+    emitted = 0
+    try:
+        while True:
+            try:
+                received = sock.recv(MAX_DATAGRAM)
+            except socket.timeout:
+                received = None
+            if received is not None:
+                header = header_from_buffer(received[:HEADER_SIZE])
+                if header.type == CommandType.ReadSamplesContent.value:
+                    stage.submit(msgpack.unpackb(received[HEADER_SIZE:], raw=False))
+
+            for x, results in stage.ready():
+                emitted += 1
+                line = '  '.join(f'{i}: rms {rms:7.3f} peak {peak:6.2f} Hz' for i, (rms, peak, _) in results.items())
+                print(f'{x:6d}  {line}')
+                first = results.get(selected_chn[0])
+                if output is not None and first is not None and first[2] is not None:
+                    buffer = packetHeader(CommandType.WriteSamplesRequest)
+                    buffer += msgpack.packb({"c": [{"i": output, "v": first[1], "t": int(first[2])}]})
+                    sock.sendto(buffer, addr)
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # stop receiving samples, also if the receiver failed
+        buffer = packetHeader(CommandType.ReadSamplesEnd)
+        sock.sendto(buffer, addr)
+        stage.drain()
+        print(f'{emitted} packets analysed, {stage.failed} failed, '
+              f'receiver waited for a free slot {stage.stalls} times')
+        stage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+
+import time
+import msgpack
+import os
+import struct
+import asyncio
+import importlib
+import traceback
+from dataclasses import dataclass
+from enum import Enum
+import argparse
+
+
+class CommandType(Enum):
+    LifeSignRequest = 0
+    LifeSignResponse = 1
+    ChannelListRequest = 200
+    ChannelListResponse = 201
+    WriteSamplesRequest = 202
+    WriteSamplesResponse = 203
+    ReadSamplesBegin = 204
+    ReadSamplesContent = 205
+    ReadSamplesEnd = 206
+
+def packetHeader(c: CommandType):
+    buffer = bytearray()
+    buffer += struct.pack('@I', 0x45554C42)  # magicToken
+    buffer += struct.pack('@B', 1)  # version
+    buffer += struct.pack('@B', 2)  # payloadType
+    buffer += struct.pack('@H', 0)  # reserved
+    process_id = os.getpid()
+    buffer += struct.pack('@Q', process_id)  # senderPid
+    unix_timestamp_millisends = int(round(time.time() * 1000))
+    buffer += struct.pack('@Q', unix_timestamp_millisends)  # senderTime_msSE
+    buffer += struct.pack('@H', 1000)  # group: om::IpcGroup::smartCoreRemotePlugin
+    buffer += struct.pack('@H', c.value)  # command
+    return buffer
+
+
+HEADER_SIZE = 28
+
+@dataclass
+class Header:
+    magic_token: int
+    type: int
+
+
+def header_from_buffer(buf):
+    magic_token = struct.unpack('@I', buf[0:4])[0]
+    command = struct.unpack('@H', buf[26:28])[0]
+    if magic_token != 0x45554C42:
+        raise ValueError
+
+    return Header(magic_token, command)
+
+
+def rss_kib():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class StepTimer:
+    """Runs a coroutine and measures every step between two awaits.
+
+    The time a plugin spends between two awaits blocks all other plugins,
+    so that is what its budget limits.
+    """
+
+    def __init__(self, coro, ctx):
+        self.coro = coro
+        self.ctx = ctx
+
+    def __await__(self):
+        steps = self.coro.__await__()
+        value = None
+        error = None
+        while True:
+            start = time.perf_counter()
+            try:
+                if error is not None:
+                    future = steps.throw(error)
+                else:
+                    future = steps.send(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                # also a step that ends with an exception counts
+                self.ctx._account(time.perf_counter() - start)
+            try:
+                value = yield future
+                error = None
+            except BaseException as e:
+                value = None
+                error = e
+
+
+class Subscription:
+    def __init__(self, indices, interval, samples, maxsize):
+        self.indices = set(indices)
+        self.interval = interval
+        self.samples = samples
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+
+class PluginContext:
+    """Everything a plugin gets from the host."""
+
+    def __init__(self, host, name, budget_ms):
+        self.host = host
+        self.name = name
+        self.budget = budget_ms / 1000
+        self.steps = 0
+        self.busy = 0.0
+        self.longest = 0.0
+        self.overruns = 0
+        self.errors = 0
+        self._warned = 0.0
+
+    @property
+    def channels(self):
+        """Shared channel map: name -> {"i": index, "w": writable, "d": data type}."""
+        return self.host.channels
+
+    def index(self, name):
+        return self.host.channels[name]['i']
+
+    def write(self, channels, token=None):
+        payload = {"c": channels}
+        if token is not None:
+            payload["a"] = token
+        self.host.send(CommandType.WriteSamplesRequest, payload)
+
+    def subscribe(self, names, interval=100, samples=1, maxsize=100):
+        """Returns a queue that receives the ReadSamplesContent payloads of these channels."""
+        subscription = Subscription([self.index(name) for name in names], interval, samples, maxsize)
+        self.host.add_subscription(self, subscription)
+        return subscription.queue
+
+    def log(self, message):
+        print(f'[{self.name}] {message}', flush=True)
+
+    def _account(self, duration):
+        self.steps += 1
+        self.busy += duration
+        self.longest = max(self.longest, duration)
+        if duration > self.budget:
+            self.overruns += 1
+            now = time.monotonic()
+            if now - self._warned > 10:
+                self._warned = now
+                self.log(f'step took {duration * 1000:.1f} ms, budget is {self.budget * 1000:.1f} ms')
+
+
+class PluginHost(asyncio.DatagramProtocol):
+    """Runs several plugins on one event loop with one socket and one channel list."""
+
+    def __init__(self, addr):
+        self.addr = addr
+        self.transport = None
+        self.channels = {}
+        self.plugins = {}         # name -> PluginContext
+        self.subscriptions = {}   # PluginContext -> [Subscription]
+        self.waiting = {}         # response command -> future
+        self.subscribed = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def send(self, command, payload=None):
+        buffer = packetHeader(command)
+        if payload is not None:
+            buffer += msgpack.packb(payload)
+        self.transport.sendto(buffer)
+
+    async def request(self, command, payload, response, timeout=2.0):
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[response.value] = future
+        self.send(command, payload)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.waiting.pop(response.value, None)
+
+    def datagram_received(self, data, addr):
+        try:
+            header = header_from_buffer(data[:HEADER_SIZE])
+        except (ValueError, struct.error):
+            return
+        payload = msgpack.unpackb(data[HEADER_SIZE:], raw=False) if len(data) > HEADER_SIZE else {}
+
+        if header.type == CommandType.ReadSamplesContent.value:
+            self._dispatch(payload)
+            return
+        future = self.waiting.get(header.type)
+        if future is not None and not future.done():
+            future.set_result(payload)
+
+    def _dispatch(self, payload):
+        for subscriptions in self.subscriptions.values():
+            for subscription in subscriptions:
+                channels = [channel for channel in payload['c'] if channel['i'] in subscription.indices]
+                if not channels:
+                    continue
+                if subscription.queue.full():
+                    # a slow plugin loses its oldest packets, not the others
+                    subscription.queue.get_nowait()
+                    subscription.dropped += 1
+                subscription.queue.put_nowait(dict(payload, c=channels))
+
+    def add_subscription(self, ctx, subscription):
+        self.subscriptions.setdefault(ctx, []).append(subscription)
+        self._resubscribe()
+
+    def _resubscribe(self):
+        # smartCORE sends one stream per client: request the union of all subscriptions
+        subscriptions = [s for subs in self.subscriptions.values() for s in subs]
+        if not subscriptions:
+            if self.subscribed is not None:
+                self.send(CommandType.ReadSamplesEnd)
+                self.subscribed = None
+            return
+        request = {
+            "t": min(s.interval for s in subscriptions),
+            "n": max(s.samples for s in subscriptions),
+            "e": False,
+            "c": sorted(set().union(*(s.indices for s in subscriptions))),
+        }
+        if request != self.subscribed:
+            self.send(CommandType.ReadSamplesBegin, request)
+            self.subscribed = request
+
+    async def start(self):
+        state = await self.request(CommandType.LifeSignRequest, {}, CommandType.LifeSignResponse)
+        if state["smartcore-state"] != "Running":
+            raise RuntimeError("smartcore is not running")
+        response = await self.request(CommandType.ChannelListRequest, {"f": ["d"]}, CommandType.ChannelListResponse)
+        self.channels = {
+            channel['n']: {"i": channel['i'], "w": channel.get('w', False), "d": channel.get('d')}
+            for channel in response['c']
+        }
+
+    async def run_plugin(self, module_name, budget_ms, max_restarts):
+        ctx = PluginContext(self, module_name.rsplit('.', 1)[-1], budget_ms)
+        self.plugins[ctx.name] = ctx
+        restarts = 0
+        while True:
+            try:
+                module = importlib.import_module(module_name)
+                await StepTimer(module.run(ctx), ctx)
+                ctx.log('finished')
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                ctx.errors += 1
+                ctx.log('failed:\n' + traceback.format_exc().rstrip())
+            finally:
+                # a restarted plugin subscribes again
+                self.subscriptions.pop(ctx, None)
+                self._resubscribe()
+            restarts += 1
+            if restarts > max_restarts:
+                ctx.log(f'giving up after {max_restarts} restarts')
+                break
+            await asyncio.sleep(min(60, 2 ** restarts))
+
+    def report(self):
+        lines = [f'RSS {rss_kib() / 1024:.1f} MiB']
+        for ctx in self.plugins.values():
+            dropped = sum(s.dropped for s in self.subscriptions.get(ctx, []))
+            mean = ctx.busy / ctx.steps * 1000 if ctx.steps else 0.0
+            lines.append(f'  {ctx.name:12s} {ctx.steps:7d} steps, mean {mean:6.3f} ms, longest '
+                         f'{ctx.longest * 1000:6.2f} ms, {ctx.overruns} over budget, {ctx.errors} errors, '
+                         f'{dropped} packets dropped')
+        return '\n'.join(lines)
+
+
+async def run_host(args):
+    loop = asyncio.get_running_loop()
+    _, host = await loop.create_datagram_endpoint(lambda: PluginHost((args.addr, args.port)),
+                                                  remote_addr=(args.addr, args.port))
+    started = time.perf_counter()
+    await host.start()
+    print(f'connected in {(time.perf_counter() - started) * 1000:.1f} ms, {len(host.channels)} channels')
+
+    tasks = [asyncio.create_task(host.run_plugin(name, args.budget, args.restarts)) for name in args.plugins]
+    try:
+        while not all(task.done() for task in tasks):
+            await asyncio.sleep(args.report)
+            print(host.report(), flush=True)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        host.subscriptions.clear()
+        host._resubscribe()
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Runs several remote plugins in one process')
+    parser.add_argument('--port', dest='port', default=61616, type=int, required=False)
+    parser.add_argument('--addr', dest='addr', default='127.0.0.1', type=str, required=False)
+    parser.add_argument('--plugins', dest='plugins', default=['plugins.funcgen', 'plugins.wattage_calc'],
+                        type=str, nargs='+', required=False, help='modules with an "async def run(ctx)"')
+    parser.add_argument('--budget', dest='budget', default=5.0, type=float, required=False,
+                        help='maximum time in ms a plugin may run between two awaits')
+    parser.add_argument('--restarts', dest='restarts', default=5, type=int, required=False)
+    parser.add_argument('--report', dest='report', default=10.0, type=float, required=False,
+                        help='seconds between two statistics reports')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_host(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
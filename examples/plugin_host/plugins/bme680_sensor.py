@@ -0,0 +1,24 @@
+import asyncio
+import time
+
+
+async def run(ctx):
+    # Imported here, so the host also starts on devices without the sensor library
+    import bme680
+
+    temperature = ctx.index("BME680.Temp")
+    try:
+        sensor = bme680.BME680(bme680.I2C_ADDR_PRIMARY)
+    except (RuntimeError, IOError):
+        sensor = bme680.BME680(bme680.I2C_ADDR_SECONDARY)
+
+    sensor.set_humidity_oversample(bme680.OS_2X)
+    sensor.set_pressure_oversample(bme680.OS_4X)
+    sensor.set_temperature_oversample(bme680.OS_8X)
+    sensor.set_filter(bme680.FILTER_SIZE_3)
+
+    while True:
+        # I2C access blocks, keep it off the event loop
+        if await asyncio.to_thread(sensor.get_sensor_data):
+            ctx.write([{"i": temperature, "v": [sensor.data.temperature], "t": [int(time.time() * 1_000)]}])
+        await asyncio.sleep(1)
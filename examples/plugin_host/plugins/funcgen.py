@@ -0,0 +1,19 @@
+import asyncio
+import math
+import time
+
+
+async def run(ctx):
+    # Same signals as the funcgen example
+    sine = ctx.index("remote.test.sine")
+    square = ctx.index("remote.test.square")
+    sharktooth = ctx.index("remote.test.sharktooth")
+
+    while True:
+        now = int(time.time() * 1_000)
+        ctx.write([
+            {"i": sine, "v": math.sin(now / 1_000), "t": now},
+            {"i": square, "v": 6 if int(time.time()) % 4 >= 2 else 0, "t": now},
+            {"i": sharktooth, "v": time.time() % 51, "t": now},
+        ])
+        await asyncio.sleep(0.01)
@@ -0,0 +1,17 @@
+async def run(ctx):
+    # Same calculation as the wattage_calc example
+    voltage = ctx.index("remote.Voltage")
+    amperage = ctx.index("remote.Amperage")
+    wattage = ctx.index("remote.Wattage")
+    samples = ctx.subscribe(["remote.Voltage", "remote.Amperage"], interval=100, samples=1)
+
+    while True:
+        payload = await samples.get()
+        channels = {channel['i']: channel for channel in payload['c']}
+        if voltage not in channels or amperage not in channels:
+            continue
+
+        volts = channels[voltage]['v'][-1]
+        amps = channels[amperage]['v'][-1]
+        timestamp = channels[voltage]['t'][-1]
+        ctx.write([{"i": wattage, "v": volts * amps, "t": timestamp}])
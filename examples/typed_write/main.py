@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+import time
+import sys
+import msgpack
+import os
+import socket
+import struct
+from dataclasses import dataclass
+from enum import Enum
+import math
+import argparse
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is optional, lists are coerced element by element then
+    np = None
+
+
+class CommandType(Enum):
+    LifeSignRequest = 0
+    LifeSignResponse = 1
+    ChannelListRequest = 200
+    ChannelListResponse = 201
+    WriteSamplesRequest = 202
+    WriteSamplesResponse = 203
+
+def packetHeader(c: CommandType):
+    buffer = bytearray()
+    buffer += struct.pack('@I', 0x45554C42)  # magicToken
+    buffer += struct.pack('@B', 1)  # version
+    buffer += struct.pack('@B', 2)  # payloadType
+    buffer += struct.pack('@H', 0)  # reserved
+    process_id = os.getpid()
+    buffer += struct.pack('@Q', process_id)  # senderPid
+    unix_timestamp_millisends = int(round(time.time() * 1000))
+    buffer += struct.pack('@Q', unix_timestamp_millisends)  # senderTime_msSE
+    buffer += struct.pack('@H', 1000)  # group: om::IpcGroup::smartCoreRemotePlugin
+    buffer += struct.pack('@H', c.value)  # command
+    return buffer
+
+
+HEADER_SIZE = 28
+
+@dataclass
+class Header:
+    magic_token: int
+    type: int
+
+
+def header_from_buffer(buf):
+    magic_token = struct.unpack('@I', buf[0:4])[0]
+    command = struct.unpack('@H', buf[26:28])[0]
+    if magic_token != 0x45554C42:
+        raise ValueError
+
+    return Header(magic_token, command)
+
+
+# value range of the smartCORE integer data types
+INT_RANGES = {
+    'int8': (-2 ** 7, 2 ** 7 - 1),
+    'int16': (-2 ** 15, 2 ** 15 - 1),
+    'int32': (-2 ** 31, 2 ** 31 - 1),
+    'int64': (-2 ** 63, 2 ** 63 - 1),
+    'uint8': (0, 2 ** 8 - 1),
+    'uint16': (0, 2 ** 16 - 1),
+    'uint32': (0, 2 ** 32 - 1),
+    'uint64': (0, 2 ** 64 - 1),
+}
+
+
+def coerce(values, data_type):
+    """Converts a value or a list/array of values to the Python type matching the channel data type."""
+    is_list = isinstance(values, (list, tuple)) or (np is not None and isinstance(values, np.ndarray))
+    if not is_list:
+        return coerce([values], data_type)[0]
+
+    if data_type in INT_RANGES:
+        low, high = INT_RANGES[data_type]
+        if np is not None:
+            array = np.asarray(values)
+            if not np.issubdtype(array.dtype, np.integer):
+                array = np.rint(array.astype(np.float64))
+                if not np.isfinite(array).all():
+                    raise ValueError(f"value not finite for {data_type}")
+            if array.size and (array.min() < low or array.max() > high):
+                raise ValueError(f"value out of range for {data_type}")
+            return array.astype(np.int64 if data_type != 'uint64' else np.uint64).tolist()
+        result = [int(round(v)) for v in values]
+        if any(v < low or v > high for v in result):
+            raise ValueError(f"value out of range for {data_type}")
+        return result
+    if data_type == 'bool':
+        if np is not None:
+            return np.asarray(values).astype(bool).tolist()
+        return [bool(v) for v in values]
+    if data_type == 'float':
+        if np is not None:
+            # rounds to single precision once, so the 4 byte encoding is exact
+            return np.asarray(values, dtype=np.float32).tolist()
+        return [struct.unpack('f', struct.pack('f', v))[0] for v in values]
+    if data_type == 'double':
+        if np is not None:
+            return np.asarray(values, dtype=np.float64).tolist()
+        return [float(v) for v in values]
+    # strings and unknown data types are sent unchanged
+    return list(values)
+
+
+class TypedEncoder:
+    """Encodes WriteSamplesRequest payloads in the smallest wire form of each channel.
+
+    The data types ("d") are requested together with the channel list.
+    Values of "float" channels are encoded as 5 byte single precision
+    floats instead of 9 byte doubles, integer and bool channels as
+    MsgPack integers and booleans.
+    """
+
+    def __init__(self):
+        self.channels = {}  # name -> {"i": index, "w": writable, "d": data type}
+        self._single = msgpack.Packer(use_single_float=True)
+        self._double = msgpack.Packer()
+
+        # statistics
+        self.bytes_typed = 0
+        self.bytes_plain = 0
+
+    def channel_list_request(self, names=None):
+        payload = {"f": ["d"]}
+        if names:
+            payload["c"] = list(names)
+        buffer = packetHeader(CommandType.ChannelListRequest)
+        buffer += msgpack.packb(payload)
+        return buffer
+
+    def update_channels(self, channels):
+        for channel in channels:
+            self.channels[channel['n']] = {
+                "i": channel['i'],
+                "w": channel.get('w', False),
+                "d": channel.get('d'),
+            }
+
+    def encode(self, samples, token=None):
+        """Builds a WriteSamplesRequest packet from [{"n": name, "v": value(s), "t": time(s)}, ...]."""
+        pack = self._double.pack
+        payload = bytearray()
+        payload += self._double.pack_map_header(1 if token is None else 2)
+        if token is not None:
+            payload += pack('a') + pack(token)
+        payload += pack('c') + self._double.pack_array_header(len(samples))
+
+        plain = {"c": []}
+        if token is not None:
+            plain['a'] = token
+        for sample in samples:
+            name = sample['n']
+            channel = self.channels.get(name)
+            if channel is None:
+                raise KeyError(f"unknown channel {name}")
+            if not channel['w']:
+                raise ValueError(f"channel {name} is not writable")
+
+            values = coerce(sample['v'], channel['d'])
+            value_packer = self._single if channel['d'] == 'float' else self._double
+            payload += self._double.pack_map_header(3 if 't' in sample else 2)
+            payload += pack('i') + pack(channel['i'])
+            payload += pack('v') + value_packer.pack(values)
+            entry = {"i": channel['i'], "v": to_list(sample['v'])}
+            if 't' in sample:
+                times = to_list(sample['t'])
+                payload += pack('t') + pack(times)
+                entry['t'] = times
+            plain['c'].append(entry)
+
+        self.bytes_typed += len(payload)
+        self.bytes_plain += len(msgpack.packb(plain))
+        return packetHeader(CommandType.WriteSamplesRequest) + payload
+
+    def report(self):
+        saved = self.bytes_plain - self.bytes_typed
+        ratio = saved / self.bytes_plain * 100 if self.bytes_plain else 0.0
+        return f'payload {self.bytes_typed} bytes instead of {self.bytes_plain} ({ratio:.1f}% saved)'
+
+
+def to_list(values):
+    if np is not None and isinstance(values, np.ndarray):
+        return values.tolist()
+    return values
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Writes test signals encoded according to the channel data types')
+    parser.add_argument('--port', dest='port', default=61616, type=int, required=False)
+    parser.add_argument('--addr', dest='addr', default='127.0.0.1', type=str, required=False)
+    parser.add_argument('--block', dest='block', default=10, type=int, required=False,
+                        help='samples per channel and packet')
+    args = parser.parse_args()
+
+    # establish connection to smartCORE
+    addr = (args.addr, args.port)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.settimeout(2.0)
+
+    buffer = packetHeader(CommandType.LifeSignRequest)
+    buffer += msgpack.packb({})
+    sock.sendto(buffer, addr)
+
+    received = sock.recv(1500)
+    header = header_from_buffer(received[:HEADER_SIZE])
+    if header.type != CommandType.LifeSignResponse.value:
+        raise RuntimeError(f"unexpected response {header.type} to LifeSignRequest")
+    if msgpack.unpackb(received[HEADER_SIZE:], raw=False)["smartcore-state"] != "Running":
+        raise RuntimeError("smartcore is not running")
+
+    # Request channel list including the data types
+    encoder = TypedEncoder()
+    sock.sendto(encoder.channel_list_request(), addr)
+    received = sock.recv(65535)
+    header = header_from_buffer(received[:HEADER_SIZE])
+    if header.type != CommandType.ChannelListResponse.value:
+        raise RuntimeError(f"unexpected response {header.type} to ChannelListRequest")
+    encoder.update_channels(msgpack.unpackb(received[HEADER_SIZE:], raw=False)['c'])
+    for name in ("remote.typed.float", "remote.typed.int32", "remote.typed.bool"):
+        print(name, encoder.channels.get(name))
+
+    print('\nGenerating:')
+    sys.stdout.flush()
+    count = 0
+    try:
+        while True:
+            now = int(time.time() * 1_000)
+            times = [now - (args.block - 1 - k) * 10 for k in range(args.block)]
+            sine = [math.sin(t / 1_000) * 100 for t in times]
+            buffer = encoder.encode([
+                {"n": "remote.typed.float", "v": sine, "t": times},
+                {"n": "remote.typed.int32", "v": sine, "t": times},
+                {"n": "remote.typed.bool", "v": [v > 0 for v in sine], "t": times},
+            ])
+            sock.sendto(buffer, addr)
+            count += 1
+            if count % 100 == 0:
+                print(encoder.report())
+                sys.stdout.flush()
+            time.sleep(args.block * 0.01)
+    except KeyboardInterrupt:
+        # stop the loop when the user presses CTRL+C
+        print(encoder.report())
+
+
+if __name__ == "__main__":
+    main()
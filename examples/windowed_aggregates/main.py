@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+
+import time
+import sys
+import msgpack
+import os
+import socket
+import struct
+import math
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+import argparse
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is only needed for BlockFFT
+    np = None
+
+
+class CommandType(Enum):
+    LifeSignRequest = 0
+    LifeSignResponse = 1
+    ChannelListRequest = 200
+    ChannelListResponse = 201
+    WriteSamplesRequest = 202
+    WriteSamplesResponse = 203
+    ReadSamplesBegin = 204
+    ReadSamplesContent = 205
+    ReadSamplesEnd = 206
+
+def packetHeader(c: CommandType):
+    buffer = bytearray()
+    buffer += struct.pack('@I', 0x45554C42)  # magicToken
+    buffer += struct.pack('@B', 1)  # version
+    buffer += struct.pack('@B', 2)  # payloadType
+    buffer += struct.pack('@H', 0)  # reserved
+    process_id = os.getpid()
+    buffer += struct.pack('@Q', process_id)  # senderPid
+    unix_timestamp_millisends = int(round(time.time() * 1000))
+    buffer += struct.pack('@Q', unix_timestamp_millisends)  # senderTime_msSE
+    buffer += struct.pack('@H', 1000)  # group: om::IpcGroup::smartCoreRemotePlugin
+    buffer += struct.pack('@H', c.value)  # command
+    return buffer
+
+
+HEADER_SIZE = 28
+MAX_DATAGRAM = 65535
+
+@dataclass
+class Header:
+    magic_token: int
+    type: int
+
+
+def header_from_buffer(buf):
+    magic_token = struct.unpack('@I', buf[0:4])[0]
+    command = struct.unpack('@H', buf[26:28])[0]
+    if magic_token != 0x45554C42:
+        raise ValueError
+
+    return Header(magic_token, command)
+
+
+class TumblingWindow:
+    """Mean, RMS, min and max over fixed, non-overlapping time windows.
+
+    Windows are aligned to multiples of `width` (in timestamp units); the
+    aggregate is emitted with the start time of its window as soon as the
+    first sample of the next window arrives.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self.start = None
+        self.late = 0
+        self._reset()
+
+    def _reset(self):
+        self.count = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, value, t):
+        out = None
+        start = t - t % self.width
+        if self.start is not None and start < self.start:
+            # late sample of a window that was already emitted
+            self.late += 1
+            return None
+        if start != self.start:
+            out = self.flush()
+            self.start = start
+        self.count += 1
+        self.sum += value
+        self.sum_sq += value * value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        return out
+
+    def flush(self):
+        """Returns the aggregate of the open window, e.g. before shutdown."""
+        if not self.count:
+            return None
+        out = (self.start, {
+            "mean": self.sum / self.count,
+            "rms": math.sqrt(self.sum_sq / self.count),
+            "min": self.min,
+            "max": self.max,
+        })
+        self._reset()
+        return out
+
+
+class SlidingWindow:
+    """Mean, RMS, min and max over the last `length` samples, emitted every `hop` samples.
+
+    Sums are updated incrementally and min/max are kept in monotonic
+    deques, so every sample costs O(1) amortized.
+    """
+
+    def __init__(self, length, hop):
+        self.length = length
+        self.hop = hop
+        self.values = deque()
+        self.mins = deque()  # (position, value), increasing values
+        self.maxs = deque()  # (position, value), decreasing values
+        self.position = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+
+    def update(self, value, t):
+        self.values.append(value)
+        self.sum += value
+        self.sum_sq += value * value
+        if len(self.values) > self.length:
+            old = self.values.popleft()
+            self.sum -= old
+            self.sum_sq -= old * old
+
+        while self.mins and self.mins[-1][1] >= value:
+            self.mins.pop()
+        self.mins.append((self.position, value))
+        while self.maxs and self.maxs[-1][1] <= value:
+            self.maxs.pop()
+        self.maxs.append((self.position, value))
+        oldest = self.position - self.length + 1
+        if self.mins[0][0] < oldest:
+            self.mins.popleft()
+        if self.maxs[0][0] < oldest:
+            self.maxs.popleft()
+
+        self.position += 1
+        if self.position % self.length == 0:
+            # limit the rounding error of the running sums
+            self.sum = math.fsum(self.values)
+            self.sum_sq = math.fsum(v * v for v in self.values)
+        if self.position % self.hop or len(self.values) < self.length:
+            return None
+        count = len(self.values)
+        return (t, {
+            "mean": self.sum / count,
+            "rms": math.sqrt(max(0.0, self.sum_sq) / count),
+            "min": self.mins[0][1],
+            "max": self.maxs[0][1],
+        })
+
+
+class BlockFFT:
+    """Dominant frequency and its amplitude of every block of `size` samples."""
+
+    def __init__(self, size, time_scale):
+        if np is None:
+            raise RuntimeError("BlockFFT requires NumPy")
+        self.size = size
+        self.time_scale = time_scale
+        self.values = np.empty(size)
+        self.times = np.empty(size)
+        self.window = np.hanning(size)
+        self.scale = 2.0 / self.window.sum()
+        self.count = 0
+
+    def update(self, value, t):
+        self.values[self.count] = value
+        self.times[self.count] = t
+        self.count += 1
+        if self.count < self.size:
+            return None
+        self.count = 0
+
+        dt = (self.times[-1] - self.times[0]) / (self.size - 1) * self.time_scale
+        if dt <= 0:
+            return None
+        spectrum = np.abs(np.fft.rfft((self.values - self.values.mean()) * self.window))
+        peak = int(np.argmax(spectrum[1:])) + 1
+        return (int(self.times[0]), {
+            "peak": float(np.fft.rfftfreq(self.size, dt)[peak]),
+            "peak_amplitude": float(spectrum[peak] * self.scale),
+        })
+
+
+class WriteBatch:
+    """Collects aggregates and sends them as one WriteSamplesRequest per flush."""
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.channels = {}  # index -> {"i": index, "v": [...], "t": [...]}
+        self.packets = 0
+        self.samples = 0
+
+    def add(self, index, value, t):
+        channel = self.channels.get(index)
+        if channel is None:
+            channel = self.channels[index] = {"i": index, "v": [], "t": []}
+        channel['v'].append(value)
+        channel['t'].append(t)
+
+    def flush(self):
+        if not self.channels:
+            return
+        buffer = packetHeader(CommandType.WriteSamplesRequest)
+        buffer += msgpack.packb({"c": list(self.channels.values())})
+        self.sock.sendto(buffer, self.addr)
+        self.packets += 1
+        self.samples += sum(len(channel['v']) for channel in self.channels.values())
+        self.channels = {}
+
+
+def packet_samples(payload, channel):
+    values = channel.get('v', [])
+    times = channel.get('t')
+    if isinstance(times, list):
+        return zip(values, times)
+    # equidistant transmission
+    start = times if times is not None else payload['t']
+    step = channel.get('s', payload.get('s', 0))
+    return ((v, start + k * step) for k, v in enumerate(values))
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Aggregates smartCORE signals and writes them back as producer channels')
+    parser.add_argument('--port', dest='port', default=61616, type=int, required=False)
+    parser.add_argument('--addr', dest='addr', default='127.0.0.1', type=str, required=False)
+    parser.add_argument('--input', dest='input', default='FuncGen.Sinus', type=str, required=False)
+    parser.add_argument('--prefix', dest='prefix', default='remote.agg', type=str, required=False,
+                        help='producer channels are named <prefix>.<aggregate>, e.g. remote.agg.rms')
+    parser.add_argument('--window', dest='window', default=1000, type=int, required=False,
+                        help='tumbling window width in ms')
+    parser.add_argument('--sliding', dest='sliding', default=0, type=int, required=False,
+                        help='use a sliding window of this many samples instead')
+    parser.add_argument('--hop', dest='hop', default=0, type=int, required=False,
+                        help='samples between two results of the sliding window (default: a quarter of --sliding)')
+    parser.add_argument('--fft-block', dest='fft_block', default=256, type=int, required=False,
+                        help='block size for the dominant frequency (0: off)')
+    parser.add_argument('--sample-time-unit', dest='unit', default='us', choices=['us', 'ms'], required=False,
+                        help='unit of the sample timestamps "t"')
+    args = parser.parse_args()
+    time_scale = 1e-6 if args.unit == 'us' else 1e-3
+    hop = args.hop or max(1, args.sliding // 4)
+    if hop < 0:
+        parser.error('--hop must be positive')
+
+    # establish connection to smartCORE
+    addr = (args.addr, args.port)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.settimeout(2.0)
+
+    buffer = packetHeader(CommandType.LifeSignRequest)
+    buffer += msgpack.packb({})
+    sock.sendto(buffer, addr)
+
+    received = sock.recv(1500)
+    header = header_from_buffer(received[:HEADER_SIZE])
+    if header.type != CommandType.LifeSignResponse.value:
+        raise RuntimeError(f"unexpected response {header.type} to LifeSignRequest")
+    if msgpack.unpackb(received[HEADER_SIZE:], raw=False)["smartcore-state"] != "Running":
+        raise RuntimeError("smartcore is not running")
+
+    # Request channel list
+    buffer = packetHeader(CommandType.ChannelListRequest)
+    buffer += msgpack.packb({})
+    sock.sendto(buffer, addr)
+    received = sock.recv(MAX_DATAGRAM)
+    header = header_from_buffer(received[:HEADER_SIZE])
+    while header.type != CommandType.ChannelListResponse.value:
+        received = sock.recv(MAX_DATAGRAM)
+        header = header_from_buffer(received[:HEADER_SIZE])
+    channels = msgpack.unpackb(received[HEADER_SIZE:], raw=False)['c']
+    indexDict = {channel['n']: channel['i'] for channel in channels}
+    outputs = {channel['n']: channel['i'] for channel in channels
+               if channel['n'].startswith(args.prefix + '.') and channel.get('w', False)}
+    print(f'writing to {sorted(outputs)}')
+
+    if args.sliding:
+        operators = [SlidingWindow(args.sliding, hop)]
+    else:
+        operators = [TumblingWindow(int(args.window * 1e-3 / time_scale))]
+    if args.fft_block:
+        operators.append(BlockFFT(args.fft_block, time_scale))
+
+    print('\n\nRead Samples Begin')
+    buffer = packetHeader(CommandType.ReadSamplesBegin)
+    payload = {
+        "t": 100,                       # how many ms between packets
+        "n": 100,                       # requested number of samples
+        "e": False,                     # with timestamp
+        "c": [indexDict[args.input]]    # Selected channels
+    }
+    buffer += msgpack.packb(payload)
+    sock.sendto(buffer, addr)
+
+    batch = WriteBatch(sock, addr)
+
+    def emit(result):
+        t_out, aggregates = result
+        print(t_out, ' '.join(f'{k} {v:.3f}' for k, v in aggregates.items()))
+        for key, aggregate in aggregates.items():
+            index = outputs.get(f'{args.prefix}.{key}')
+            if index is not None:
+                batch.add(index, aggregate, t_out)
+
+    consumed = 0
+    repeated = 0
+    last_t = {}  # channel index -> timestamp of the last consumed sample
+    try:
+        while True:
+            received = sock.recv(MAX_DATAGRAM)
+            header = header_from_buffer(received[:HEADER_SIZE])
+            if header.type != CommandType.ReadSamplesContent.value:
+                continue
+
+            unpacked = msgpack.unpackb(received[HEADER_SIZE:], raw=False)
+            for channel in unpacked['c']:
+                for value, t in packet_samples(unpacked, channel):
+                    # without a new sample, smartCORE repeats the last value with its old timestamp
+                    if t <= last_t.get(channel['i'], -math.inf):
+                        repeated += 1
+                        continue
+                    last_t[channel['i']] = t
+                    consumed += 1
+                    for operator in operators:
+                        result = operator.update(value, t)
+                        if result is not None:
+                            emit(result)
+            # one write per received packet at most
+            batch.flush()
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        # stop receiving samples
+        buffer = packetHeader(CommandType.ReadSamplesEnd)
+        sock.sendto(buffer, addr)
+        # write the aggregate of the open tumbling window as well
+        for operator in operators:
+            result = operator.flush() if hasattr(operator, 'flush') else None
+            if result is not None:
+                emit(result)
+        batch.flush()
+        print(f'{consumed} samples consumed, {repeated} repeated samples skipped, '
+              f'{batch.samples} aggregates written in {batch.packets} packets')
+
+
+if __name__ == "__main__":
+    main()
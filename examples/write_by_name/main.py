@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+import time
+import sys
+import msgpack
+import os
+import socket
+import struct
+from dataclasses import dataclass
+from enum import Enum
+import math
+import argparse
+
+
+class CommandType(Enum):
+    LifeSignRequest = 0
+    LifeSignResponse = 1
+    WriteSamplesByName = 100
+    ChannelListRequest = 200
+    ChannelListResponse = 201
+    WriteSamplesRequest = 202
+    WriteSamplesResponse = 203
+
+def packetHeader(c: CommandType):
+    buffer = bytearray()
+    buffer += struct.pack('@I', 0x45554C42)  # magicToken
+    buffer += struct.pack('@B', 1)  # version
+    buffer += struct.pack('@B', 2)  # payloadType
+    buffer += struct.pack('@H', 0)  # reserved
+    process_id = os.getpid()
+    buffer += struct.pack('@Q', process_id)  # senderPid
+    unix_timestamp_millisends = int(round(time.time() * 1000))
+    buffer += struct.pack('@Q', unix_timestamp_millisends)  # senderTime_msSE
+    buffer += struct.pack('@H', 1000)  # group: om::IpcGroup::smartCoreRemotePlugin
+    buffer += struct.pack('@H', c.value)  # command
+    return buffer
+
+
+HEADER_SIZE = 28
+
+@dataclass
+class Header:
+    magic_token: int
+    type: int
+
+
+def header_from_buffer(buf):
+    magic_token = struct.unpack('@I', buf[0:4])[0]
+    command = struct.unpack('@H', buf[26:28])[0]
+    if magic_token != 0x45554C42:
+        raise ValueError
+
+    return Header(magic_token, command)
+
+
+class NameWriter:
+    """Writes samples by channel name, but sends them by index.
+
+    write() takes the same channel list as the WriteSamplesByName payload
+    ({"n": name, "v": value, "t": time}). Names are resolved once through
+    the ChannelList; writable channels go out as a compact
+    WriteSamplesRequest, everything else falls back to WriteSamplesByName.
+    """
+
+    def __init__(self, sock, addr, timeout=1.0, retry_interval=5.0):
+        self.sock = sock
+        self.addr = addr
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.index_map = {}  # name -> index, or None if it has to be written by name
+        self._next_resolve = 0.0
+
+        # statistics
+        self.packets = 0
+        self.bytes_sent = 0
+        self.bytes_by_name = 0
+        self.fallbacks = 0
+
+    def resolve(self, names):
+        names = [name for name in names if name not in self.index_map]
+        if not names or time.monotonic() < self._next_resolve:
+            return
+        buffer = packetHeader(CommandType.ChannelListRequest)
+        buffer += msgpack.packb({"c": names})
+        self.sock.sendto(buffer, self.addr)
+
+        channels = None
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            self.sock.settimeout(max(0.001, deadline - time.monotonic()))
+            try:
+                received = self.sock.recv(65535)
+            except socket.timeout:
+                break
+            header = header_from_buffer(received[:HEADER_SIZE])
+            if header.type == CommandType.ChannelListResponse.value:
+                channels = msgpack.unpackb(received[HEADER_SIZE:], raw=False)['c']
+                break
+
+        if channels is None:
+            # request or response lost: write these names by name for now and ask again later
+            self._next_resolve = time.monotonic() + self.retry_interval
+            return
+        for name in names:
+            # not in the response: unknown to smartCORE
+            self.index_map[name] = None
+        for channel in channels:
+            # only producer channels can be written by index
+            if channel['n'] in self.index_map and channel.get('w', False):
+                self.index_map[channel['n']] = channel['i']
+
+    def write(self, channels, token=None):
+        """Sends the samples and returns the number of bytes saved compared to byName."""
+        self.resolve([channel['n'] for channel in channels])
+
+        by_index = []
+        by_name = []
+        for channel in channels:
+            index = self.index_map.get(channel['n'])
+            if index is None:
+                by_name.append(channel)
+                continue
+            entry = {"i": index, "v": channel['v']}
+            if 't' in channel:
+                entry['t'] = channel['t']
+            by_index.append(entry)
+
+        plain = HEADER_SIZE + len(msgpack.packb({"c": channels}))
+        packets = []
+        if by_index:
+            payload = {"c": by_index}
+            if token is not None:
+                payload['a'] = token
+            buffer = packetHeader(CommandType.WriteSamplesRequest)
+            buffer += msgpack.packb(payload)
+            packets.append(buffer)
+        if by_name:
+            buffer = packetHeader(CommandType.WriteSamplesByName)
+            buffer += msgpack.packb({"c": by_name})
+            packets.append(buffer)
+
+        # A second header can cost more than the short indices save
+        if len(packets) > 1 and sum(len(buffer) for buffer in packets) >= plain:
+            buffer = packetHeader(CommandType.WriteSamplesByName)
+            buffer += msgpack.packb({"c": channels})
+            packets = [buffer]
+            by_name = channels
+
+        sent = 0
+        for buffer in packets:
+            self.sock.sendto(buffer, self.addr)
+            sent += len(buffer)
+        self.packets += len(packets)
+        self.fallbacks += len(by_name)
+        self.bytes_sent += sent
+        self.bytes_by_name += plain
+        return plain - sent
+
+    def report(self):
+        saved = self.bytes_by_name - self.bytes_sent
+        ratio = saved / self.bytes_by_name * 100 if self.bytes_by_name else 0.0
+        return (f'{self.packets} packets, {self.bytes_sent} bytes sent instead of {self.bytes_by_name} '
+                f'({saved} bytes / {ratio:.1f}% saved), {self.fallbacks} samples written by name')
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Writes test signals by name, translated to index based writes')
+    parser.add_argument('--port', dest='port', default=61616, type=int, required=False)
+    parser.add_argument('--addr', dest='addr', default='127.0.0.1', type=str, required=False)
+    args = parser.parse_args()
+
+    # establish connection to smartCORE
+    addr = (args.addr, args.port)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.settimeout(2.0)
+
+    buffer = packetHeader(CommandType.LifeSignRequest)
+    buffer += msgpack.packb({})
+    sock.sendto(buffer, addr)
+
+    received = sock.recv(1500)
+    header = header_from_buffer(received[:HEADER_SIZE])
+    if header.type != CommandType.LifeSignResponse.value:
+        raise RuntimeError(f"unexpected response {header.type} to LifeSignRequest")
+    if msgpack.unpackb(received[HEADER_SIZE:], raw=False)["smartcore-state"] != "Running":
+        raise RuntimeError("smartcore is not running")
+
+    writer = NameWriter(sock, addr)
+
+    print('\nGenerating:')
+    sys.stdout.flush()
+    count = 0
+    try:
+        while True:
+            now = int(time.time() * 1_000)
+            saved = writer.write([
+                {"n": "remote.test.sine", "v": math.sin(now / 1_000), "t": now},
+                {"n": "remote.test.square", "v": 6 if int(time.time()) % 4 >= 2 else 0, "t": now},
+                {"n": "remote.test.sharktooth", "v": time.time() % 51, "t": now},
+            ])
+            count += 1
+            if count % 100 == 0:
+                print(f'{saved} bytes saved per packet; {writer.report()}')
+                sys.stdout.flush()
+            time.sleep(0.01)
+    except KeyboardInterrupt:
+        # stop the loop when the user presses CTRL+C
+        print(writer.report())
+
+
+if __name__ == "__main__":
+    main()
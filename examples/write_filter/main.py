@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+
+import time
+import sys
+import msgpack
+import os
+import socket
+import struct
+from dataclasses import dataclass
+from enum import Enum
+import math
+import argparse
+
+
+class CommandType(Enum):
+    LifeSignRequest = 0
+    LifeSignResponse = 1
+    ChannelListRequest = 200
+    ChannelListResponse = 201
+    WriteSamplesRequest = 202
+    WriteSamplesResponse = 203
+
+def packetHeader(c: CommandType):
+    buffer = bytearray()
+    buffer += struct.pack('@I', 0x45554C42)  # magicToken
+    buffer += struct.pack('@B', 1)  # version
+    buffer += struct.pack('@B', 2)  # payloadType
+    buffer += struct.pack('@H', 0)  # reserved
+    process_id = os.getpid()
+    buffer += struct.pack('@Q', process_id)  # senderPid
+    unix_timestamp_millisends = int(round(time.time() * 1000))
+    buffer += struct.pack('@Q', unix_timestamp_millisends)  # senderTime_msSE
+    buffer += struct.pack('@H', 1000)  # group: om::IpcGroup::smartCoreRemotePlugin
+    buffer += struct.pack('@H', c.value)  # command
+    return buffer
+
+
+HEADER_SIZE = 28
+
+@dataclass
+class Header:
+    magic_token: int
+    type: int
+
+
+def header_from_buffer(buf):
+    magic_token = struct.unpack('@I', buf[0:4])[0]
+    command = struct.unpack('@H', buf[26:28])[0]
+    if magic_token != 0x45554C42:
+        raise ValueError
+
+    return Header(magic_token, command)
+
+
+class WriteFilter:
+    """Decides which samples of one producer channel have to be written.
+
+    Deadband (default): a sample is written if it differs from the last
+    written value by more than `deadband` or `relative` * |last value|.
+
+    Swinging door (swinging_door=True): a sample is written only when the
+    samples since the last written one can no longer be represented by a
+    straight line within +/- the deadband. The written samples are real
+    samples with their original timestamps; smartCORE (or the reader)
+    interpolates linearly between them.
+
+    In both modes a sample is written at least every `max_silence`
+    (in timestamp units) as keepalive.
+    """
+
+    def __init__(self, deadband=0.0, relative=0.0, max_silence=None, swinging_door=False):
+        self.deadband = deadband
+        self.relative = relative
+        self.max_silence = max_silence
+        self.swinging_door = swinging_door
+        self.last = None      # last written (value, t)
+        self.held = None      # latest sample not written yet (swinging door)
+        self.upper = math.inf     # upper door: largest slope allowed from the last written sample
+        self.lower = -math.inf    # lower door: smallest slope allowed
+
+    def _width(self, reference):
+        return max(self.deadband, self.relative * abs(reference))
+
+    def _keep(self, value, t):
+        self.last = (value, t)
+        self.held = None
+        self.upper = math.inf
+        self.lower = -math.inf
+        return [(value, t)]
+
+    def update(self, value, t):
+        """Returns the samples [(value, t), ...] to write for this new sample."""
+        if self.last is None:
+            return self._keep(value, t)
+        last_value, last_t = self.last
+        if self.max_silence is not None and t - last_t >= self.max_silence:
+            kept = [self.held] if self.held is not None and self.held[1] > last_t else []
+            return kept + self._keep(value, t)
+
+        if not self.swinging_door:
+            if abs(value - last_value) > self._width(last_value):
+                return self._keep(value, t)
+            return []
+
+        dt = t - last_t
+        if dt <= 0:
+            return []
+        slope = (value - last_value) / dt
+        if self.lower <= slope <= self.upper:
+            # the line to this sample passes all samples since the last
+            # written one within the deadband: nothing to write yet
+            width = self._width(last_value)
+            self.upper = min(self.upper, slope + width / dt)
+            self.lower = max(self.lower, slope - width / dt)
+            self.held = (value, t)
+            return []
+
+        # doors opened: the previous sample ends the line, restart from it
+        if self.held is None:
+            return self._keep(value, t)
+        held = self.held
+        self._keep(*held)
+        return [held] + self.update(value, t)
+
+    def flush(self):
+        """Returns the sample held back by the swinging door, e.g. before shutdown."""
+        if self.held is None:
+            return []
+        return self._keep(*self.held)
+
+
+class FilteredWriter:
+    """Sends the samples that pass the filter of their channel, one WriteSamplesRequest per call."""
+
+    def __init__(self, sock, addr, filters):
+        self.sock = sock
+        self.addr = addr
+        self.filters = filters  # channel index -> WriteFilter
+
+        # statistics
+        self.samples_in = 0
+        self.samples_out = 0
+        self.calls = 0
+        self.packets = 0
+        self.bytes_sent = 0
+        self.bytes_unfiltered = 0   # what writing every sample would have cost
+
+    def write(self, samples):
+        """samples: [(channel index, value, t), ...]"""
+        self.calls += 1
+        self.bytes_unfiltered += HEADER_SIZE + len(msgpack.packb(
+            {"c": [{"i": index, "v": [value], "t": [t]} for index, value, t in samples]}))
+        channels = {}
+        for index, value, t in samples:
+            self.samples_in += 1
+            kept = self.filters[index].update(value, t)
+            if kept:
+                channel = channels.setdefault(index, {"i": index, "v": [], "t": []})
+                for v, kept_t in kept:
+                    channel['v'].append(v)
+                    channel['t'].append(kept_t)
+        self._send(channels)
+
+    def flush(self):
+        channels = {}
+        for index, write_filter in self.filters.items():
+            for v, t in write_filter.flush():
+                channel = channels.setdefault(index, {"i": index, "v": [], "t": []})
+                channel['v'].append(v)
+                channel['t'].append(t)
+        self._send(channels)
+
+    def _send(self, channels):
+        if not channels:
+            return
+        buffer = packetHeader(CommandType.WriteSamplesRequest)
+        buffer += msgpack.packb({"c": list(channels.values())})
+        self.sock.sendto(buffer, self.addr)
+        self.packets += 1
+        self.bytes_sent += len(buffer)
+        self.samples_out += sum(len(channel['v']) for channel in channels.values())
+
+    def report(self):
+        ratio = self.samples_out / self.samples_in * 100 if self.samples_in else 0.0
+        saved = (1 - self.bytes_sent / self.bytes_unfiltered) * 100 if self.bytes_unfiltered else 0.0
+        return (f'{self.samples_out} of {self.samples_in} samples written ({ratio:.1f}%), '
+                f'{self.packets} packets instead of {self.calls}, '
+                f'{self.bytes_sent} bytes instead of {self.bytes_unfiltered} ({saved:.1f}% saved)')
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Generates test signals and writes only the samples that matter')
+    parser.add_argument('--port', dest='port', default=61616, type=int, required=False)
+    parser.add_argument('--addr', dest='addr', default='127.0.0.1', type=str, required=False)
+    parser.add_argument('--deadband', dest='deadband', default=0.05, type=float, required=False,
+                        help='absolute deadband (or door width with --swinging-door)')
+    parser.add_argument('--relative', dest='relative', default=0.0, type=float, required=False,
+                        help='relative deadband, e.g. 0.01 for 1%% of the last value')
+    parser.add_argument('--max-silence', dest='max_silence', default=10.0, type=float, required=False,
+                        help='seconds after which a sample is written in any case')
+    parser.add_argument('--swinging-door', dest='swinging_door', action='store_true')
+    args = parser.parse_args()
+
+    # establish connection to smartCORE
+    addr = (args.addr, args.port)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.settimeout(2.0)
+
+    buffer = packetHeader(CommandType.LifeSignRequest)
+    buffer += msgpack.packb({})
+    sock.sendto(buffer, addr)
+
+    received = sock.recv(1500)
+    header = header_from_buffer(received[:HEADER_SIZE])
+    if header.type != CommandType.LifeSignResponse.value:
+        raise RuntimeError(f"unexpected response {header.type} to LifeSignRequest")
+    if msgpack.unpackb(received[HEADER_SIZE:], raw=False)["smartcore-state"] != "Running":
+        raise RuntimeError("smartcore is not running")
+
+    # Request channel list
+    buffer = packetHeader(CommandType.ChannelListRequest)
+    buffer += msgpack.packb({})
+    sock.sendto(buffer, addr)
+    received = sock.recv(65535)
+    header = header_from_buffer(received[:HEADER_SIZE])
+    if header.type != CommandType.ChannelListResponse.value:
+        raise RuntimeError(f"unexpected response {header.type} to ChannelListRequest")
+    indexDict = {channel['n']: channel['i'] for channel in msgpack.unpackb(received[HEADER_SIZE:], raw=False)['c']}
+
+    sine = indexDict["remote.test.sine"]
+    square = indexDict["remote.test.square"]
+    sharktooth = indexDict["remote.test.sharktooth"]
+    # timestamps are in ms, as in the funcgen example
+    filters = {index: WriteFilter(args.deadband, args.relative, args.max_silence * 1_000, args.swinging_door)
+               for index in (sine, square, sharktooth)}
+    writer = FilteredWriter(sock, addr, filters)
+
+    print('\nGenerating:')
+    sys.stdout.flush()
+    try:
+        while True:
+            now = int(time.time() * 1_000)
+            writer.write([
+                (sine, math.sin(now / 1_000), now),
+                (square, 6 if int(time.time()) % 4 >= 2 else 0, now),
+                (sharktooth, time.time() % 51, now),
+            ])
+            if writer.calls % 500 == 0:
+                print(writer.report())
+                sys.stdout.flush()
+            time.sleep(0.01)
+    except KeyboardInterrupt:
+        # write the samples held back by the filters before stopping
+        writer.flush()
+        print(writer.report())
+
+
+if __name__ == "__main__":
+    main()